@@ -3,155 +3,291 @@
 
 import streamlit as st
 import json
+import logging
+import sqlite3
+import threading
 from datetime import datetime
 from typing import List, Dict
 import os
 
+logger = logging.getLogger(__name__)
+
+CHAT_DB_PATH = "database/chats.db"
+# Legacy single-file store, imported into SQLite the first time the DB is created
 CHAT_HISTORY_PATH = "database/chat_history.json"
 
+_conn = None
+_conn_lock = threading.Lock()
+
+
+def _import_legacy_history(conn: sqlite3.Connection):
+    """Copy every session from the legacy JSON store into the messages table"""
+    try:
+        with open(CHAT_HISTORY_PATH, "r") as f:
+            all_chats = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, json.JSONDecodeError):
+        logger.exception("legacy chat history import failed")
+        return
+    
+    conn.executemany(
+        "INSERT INTO messages (session_id, ts, role, content) VALUES (?, ?, ?, ?)",
+        [
+            (session_id, str(msg.get("timestamp", "")), msg["role"], msg["content"])
+            for session_id, messages in all_chats.items()
+            for msg in messages
+        ]
+    )
+
 
 def init_chat_db():
-    """Initialize chat history database"""
-    os.makedirs("database", exist_ok=True)
+    """Initialize chat history database (no-op once the connection is open)"""
+    global _conn
     
-    if not os.path.exists(CHAT_HISTORY_PATH):
-        with open(CHAT_HISTORY_PATH, "w") as f:
-            json.dump({}, f)
+    with _conn_lock:
+        if _conn is not None:
+            return
+        
+        conn = None
+        try:
+            os.makedirs("database", exist_ok=True)
+            
+            conn = sqlite3.connect(CHAT_DB_PATH, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                is_new = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages'"
+                ).fetchone() is None
+                
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS messages ("
+                    "session_id TEXT NOT NULL, ts TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id)")
+                
+                if is_new:
+                    _import_legacy_history(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except (OSError, sqlite3.Error):
+            logger.exception("init_chat_db failed")
+            if conn is not None:
+                conn.close()
+            return
+        
+        _conn = conn
 
 
+@st.cache_data(ttl=24 * 3600, max_entries=256, show_spinner=False)
 def load_chat_history(session_id: str) -> List[Dict]:
-    """Load chat history for a session"""
-    if not os.path.exists(CHAT_HISTORY_PATH):
+    """Load chat history for a session (cached until the next save)"""
+    if _conn is None:
+        logger.error("load_chat_history: chat database is not open")
         return []
     
     try:
-        with open(CHAT_HISTORY_PATH, "r") as f:
-            all_chats = json.load(f)
-            return all_chats.get(session_id, [])
-    except:
+        with _conn_lock:
+            rows = _conn.execute(
+                "SELECT role, content, ts FROM messages WHERE session_id = ? ORDER BY rowid",
+                (session_id,)
+            ).fetchall()
+    except sqlite3.Error:
+        logger.exception("load_chat_history failed")
         return []
+    
+    return [{"role": role, "content": content, "timestamp": ts} for role, content, ts in rows]
 
 
 def save_chat_history(session_id: str, messages: List[Dict]) -> bool:
-    """Save chat history"""
-    try:
-        with open(CHAT_HISTORY_PATH, "r") as f:
-            all_chats = json.load(f)
-    except:
-        all_chats = {}
-    
-    all_chats[session_id] = messages
+    """Save chat history
+
+    Messages are append-only, so only the ones not yet stored for the session
+    are inserted; a shorter list (e.g. Clear Chat) rewrites the session.
+    Timestamps must already be ISO strings (``datetime.now().isoformat()``).
+    """
+    if _conn is None:
+        logger.error("save_chat_history: chat database is not open")
+        return False
     
     try:
-        with open(CHAT_HISTORY_PATH, "w") as f:
-            json.dump(all_chats, f, indent=4, default=str)
+        with _conn_lock:
+            _conn.execute("BEGIN IMMEDIATE")
+            try:
+                (stored,) = _conn.execute(
+                    "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                
+                if len(messages) < stored:
+                    _conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                    stored = 0
+                
+                _conn.executemany(
+                    "INSERT INTO messages (session_id, ts, role, content) VALUES (?, ?, ?, ?)",
+                    [
+                        (session_id, msg["timestamp"], msg["role"], msg["content"])
+                        for msg in messages[stored:]
+                    ]
+                )
+                _conn.execute("COMMIT")
+            except Exception:
+                _conn.execute("ROLLBACK")
+                raise
+        load_chat_history.clear()
         return True
-    except Exception as e:
-        print(f"Error saving chat: {e}")
+    except sqlite3.Error:
+        logger.exception("save_chat_history failed")
         return False
 
 
+# Disease-specific knowledge base
+_KNOWLEDGE_BASE = {
+    "Pneumonia": {
+        "imaging_findings": "Consolidation in lung fields, air bronchograms visible",
+        "clinical_correlation": "Patient presents with fever, cough, and dyspnea",
+        "differential": "Consider viral pneumonia, TB, aspiration",
+        "management": "Antibiotics based on culture, oxygen support if needed",
+        "complications": "Sepsis, respiratory failure, empyema",
+        "followup": "Repeat X-ray in 6-8 weeks after treatment"
+    },
+    "Brain Tumor": {
+        "imaging_findings": "Mass with mass effect, surrounding edema",
+        "clinical_correlation": "Headaches, visual disturbance, seizures",
+        "differential": "Glioblastoma, metastasis, meningioma",
+        "management": "Neurosurgery consultation, possible biopsy/resection",
+        "complications": "Herniation, increased ICP, radiation necrosis",
+        "followup": "MRI surveillance, neuropsych evaluation"
+    },
+    "Diabetic Retinopathy": {
+        "imaging_findings": "Microaneurysms, dot-blot hemorrhages, exudates",
+        "clinical_correlation": "Blurred vision, floaters, vision loss",
+        "differential": "Consider central artery occlusion, branch vein occlusion",
+        "management": "Laser therapy, anti-VEGF injections, control blood glucose",
+        "complications": "Vision loss, vitreous hemorrhage, rubeotic glaucoma",
+        "followup": "Ophthalmology every 3-6 months"
+    },
+    "Tuberculosis": {
+        "imaging_findings": "Upper lobe infiltrates, cavitary lesions",
+        "clinical_correlation": "Persistent cough, night sweats, hemoptysis",
+        "differential": "Fungal infection, NTM, silicosis",
+        "management": "6-month RIPE therapy, directly observed therapy (DOT)",
+        "complications": "Multi-drug resistance, hepatotoxicity, IRIS",
+        "followup": "Sputum smear microscopy monthly x 3"
+    },
+    "Skin Cancer": {
+        "imaging_findings": "Asymmetry, border irregularity, color variation",
+        "clinical_correlation": "Changing mole, itching, bleeding",
+        "differential": "Benign nevus, basal cell carcinoma, squamous cell",
+        "management": "Wide local excision, Mohs surgery, immunotherapy",
+        "complications": "Metastasis, relapse, lymphedema",
+        "followup": "Dermatology surveillance every 3-6 months"
+    },
+    "Malaria": {
+        "imaging_findings": "Usually normal, check for complications",
+        "clinical_correlation": "Fever, chills, sweating in endemic area",
+        "differential": "Dengue, typhoid, influenza",
+        "management": "Artemether-lumefantrine, supportive care",
+        "complications": "Cerebral malaria, severe anemia, AKI",
+        "followup": "Blood smear negative before discharge"
+    },
+    "Dental": {
+        "imaging_findings": "Periapical radiolucency, bone loss",
+        "clinical_correlation": "Tooth pain, swelling, mobility",
+        "differential": "Cyst, granuloma, neoplasm",
+        "management": "Root canal therapy, extraction, antibiotics",
+        "complications": "Abscess, osteomyelitis, cellulitis",
+        "followup": "6-month radiograph verification"
+    }
+}
+
+# Intents in match priority order: the first whose keywords appear in the message wins
+_INTENT_KEYWORDS = (
+    ("imaging_findings", ("finding", "image", "scan")),
+    ("differential", ("differential", "other possibility", "rule out")),
+    ("management", ("management", "treatment", "how do we")),
+    ("complications", ("complication", "risk", "what if")),
+    ("followup", ("follow", "next", "when")),
+    ("confidence", ("confident", "sure", "certain")),
+    ("compare", ("compare", "previous", "change")),
+)
+
+_DEFAULT_INTENT = "clinical_correlation"
+
+# Fallback text for diseases missing from the knowledge base
+_KB_DEFAULTS = {
+    "imaging_findings": "Analysis in progress...",
+    "differential": "Multiple possibilities exist",
+    "management": "Treatment plan pending",
+    "complications": "Various complications possible",
+    "followup": "Follow-up needed",
+    "clinical_correlation": "Analysis in progress...",
+}
+
+# Response per intent; {disease} and {kb} are filled per disease at import, {conf} per assistant
+_INTENT_TEMPLATES = {
+    "imaging_findings": "**Imaging Findings:**\n{kb}\n\nThese findings are consistent with {disease}.",
+    "differential": "**Differential Diagnosis:**\n{kb}\n\nHowever, current imaging and presentation most consistent with {disease} ({conf} confidence).",
+    "management": "**Management Approach:**\n{kb}\n\nRecommend multidisciplinary consultation for definitive treatment plan.",
+    "complications": "**Potential Complications:**\n{kb}\n\nClose monitoring recommended to identify complications early.",
+    "followup": "**Follow-up Plan:**\n{kb}\n\nSchedule follow-up imaging and clinical assessment as per protocol.",
+    "confidence": "**Confidence Analysis:**\nCurrent AI confidence: {conf}\n\nThis confidence level is based on:\n- Image quality and clarity\n- Imaging findings consistency\n- Model training data alignment\n- Clinical presentation match\n\nAlways correlate with clinical presentation.",
+    "compare": "**Comparative Analysis:**\nTo compare with previous imaging, please upload the prior scan. I can then highlight:\n- Progression or improvement\n- New findings\n- Treatment response\n- Size/extent changes",
+    "clinical_correlation": "**Regarding {disease}:**\n\n{kb}\n\nCurrent confidence: {conf}\n\nWhat specific aspect would you like to discuss?",
+}
+
+
+def _classify_intent(lower_msg: str) -> str:
+    """Map a lower-cased user message to a response intent"""
+    for intent, keywords in _INTENT_KEYWORDS:
+        if any(keyword in lower_msg for keyword in keywords):
+            return intent
+    return _DEFAULT_INTENT
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _specialize_template(disease: str, intent: str) -> str:
+    """Fill the disease-specific parts of an intent template, leaving {conf} open"""
+    kb = _KNOWLEDGE_BASE.get(disease, {})
+    return _INTENT_TEMPLATES[intent].format_map({
+        "disease": _escape_braces(disease),
+        "kb": _escape_braces(kb.get(intent, _KB_DEFAULTS.get(intent, ""))),
+        "conf": "{conf}",
+    })
+
+
+_RESPONSE_TEMPLATES = {
+    (disease, intent): _specialize_template(disease, intent)
+    for disease in _KNOWLEDGE_BASE
+    for intent in _INTENT_TEMPLATES
+}
+
+
 class DiagnosisAIAssistant:
     """AI Assistant for interactive diagnosis discussion"""
     
     def __init__(self, disease: str, confidence: float):
         self.disease = disease
         self.confidence = confidence
+        self._conf_str = f"{confidence:.1f}%"
         self.conversation_memory = []
     
     def generate_response(self, user_message: str) -> str:
         """Generate AI response to user query"""
+        intent = _classify_intent(user_message.lower())
         
-        # Disease-specific knowledge base
-        knowledge_base = {
-            "Pneumonia": {
-                "imaging_findings": "Consolidation in lung fields, air bronchograms visible",
-                "clinical_correlation": "Patient presents with fever, cough, and dyspnea",
-                "differential": "Consider viral pneumonia, TB, aspiration",
-                "management": "Antibiotics based on culture, oxygen support if needed",
-                "complications": "Sepsis, respiratory failure, empyema",
-                "followup": "Repeat X-ray in 6-8 weeks after treatment"
-            },
-            "Brain Tumor": {
-                "imaging_findings": "Mass with mass effect, surrounding edema",
-                "clinical_correlation": "Headaches, visual disturbance, seizures",
-                "differential": "Glioblastoma, metastasis, meningioma",
-                "management": "Neurosurgery consultation, possible biopsy/resection",
-                "complications": "Herniation, increased ICP, radiation necrosis",
-                "followup": "MRI surveillance, neuropsych evaluation"
-            },
-            "Diabetic Retinopathy": {
-                "imaging_findings": "Microaneurysms, dot-blot hemorrhages, exudates",
-                "clinical_correlation": "Blurred vision, floaters, vision loss",
-                "differential": "Consider central artery occlusion, branch vein occlusion",
-                "management": "Laser therapy, anti-VEGF injections, control blood glucose",
-                "complications": "Vision loss, vitreous hemorrhage, rubeotic glaucoma",
-                "followup": "Ophthalmology every 3-6 months"
-            },
-            "Tuberculosis": {
-                "imaging_findings": "Upper lobe infiltrates, cavitary lesions",
-                "clinical_correlation": "Persistent cough, night sweats, hemoptysis",
-                "differential": "Fungal infection, NTM, silicosis",
-                "management": "6-month RIPE therapy, directly observed therapy (DOT)",
-                "complications": "Multi-drug resistance, hepatotoxicity, IRIS",
-                "followup": "Sputum smear microscopy monthly x 3"
-            },
-            "Skin Cancer": {
-                "imaging_findings": "Asymmetry, border irregularity, color variation",
-                "clinical_correlation": "Changing mole, itching, bleeding",
-                "differential": "Benign nevus, basal cell carcinoma, squamous cell",
-                "management": "Wide local excision, Mohs surgery, immunotherapy",
-                "complications": "Metastasis, relapse, lymphedema",
-                "followup": "Dermatology surveillance every 3-6 months"
-            },
-            "Malaria": {
-                "imaging_findings": "Usually normal, check for complications",
-                "clinical_correlation": "Fever, chills, sweating in endemic area",
-                "differential": "Dengue, typhoid, influenza",
-                "management": "Artemether-lumefantrine, supportive care",
-                "complications": "Cerebral malaria, severe anemia, AKI",
-                "followup": "Blood smear negative before discharge"
-            },
-            "Dental": {
-                "imaging_findings": "Periapical radiolucency, bone loss",
-                "clinical_correlation": "Tooth pain, swelling, mobility",
-                "differential": "Cyst, granuloma, neoplasm",
-                "management": "Root canal therapy, extraction, antibiotics",
-                "complications": "Abscess, osteomyelitis, cellulitis",
-                "followup": "6-month radiograph verification"
-            }
-        }
-        
-        # Get knowledge base for this disease
-        kb = knowledge_base.get(self.disease, {})
-        
-        # Response logic based on user query
-        lower_msg = user_message.lower()
-        
-        if "finding" in lower_msg or "image" in lower_msg or "scan" in lower_msg:
-            return f"**Imaging Findings:**\n{kb.get('imaging_findings', 'Analysis in progress...')}\n\nThese findings are consistent with {self.disease}."
-        
-        elif "differential" in lower_msg or "other possibility" in lower_msg or "rule out" in lower_msg:
-            return f"**Differential Diagnosis:**\n{kb.get('differential', 'Multiple possibilities exist')}\n\nHowever, current imaging and presentation most consistent with {self.disease} ({self.confidence:.1f}% confidence)."
-        
-        elif "management" in lower_msg or "treatment" in lower_msg or "how do we" in lower_msg:
-            return f"**Management Approach:**\n{kb.get('management', 'Treatment plan pending')}\n\nRecommend multidisciplinary consultation for definitive treatment plan."
-        
-        elif "complication" in lower_msg or "risk" in lower_msg or "what if" in lower_msg:
-            return f"**Potential Complications:**\n{kb.get('complications', 'Various complications possible')}\n\nClose monitoring recommended to identify complications early."
-        
-        elif "follow" in lower_msg or "next" in lower_msg or "when" in lower_msg:
-            return f"**Follow-up Plan:**\n{kb.get('followup', 'Follow-up needed')}\n\nSchedule follow-up imaging and clinical assessment as per protocol."
-        
-        elif "confident" in lower_msg or "sure" in lower_msg or "certain" in lower_msg:
-            return f"**Confidence Analysis:**\nCurrent AI confidence: {self.confidence:.1f}%\n\nThis confidence level is based on:\n- Image quality and clarity\n- Imaging findings consistency\n- Model training data alignment\n- Clinical presentation match\n\nAlways correlate with clinical presentation."
-        
-        elif "compare" in lower_msg or "previous" in lower_msg or "change" in lower_msg:
-            return f"**Comparative Analysis:**\nTo compare with previous imaging, please upload the prior scan. I can then highlight:\n- Progression or improvement\n- New findings\n- Treatment response\n- Size/extent changes"
+        template = _RESPONSE_TEMPLATES.get((self.disease, intent))
+        if template is None:
+            template = _specialize_template(self.disease, intent)
         
-        else:
-            # Default response
-            return f"**Regarding {self.disease}:**\n\n{kb.get('clinical_correlation', 'Analysis in progress...')}\n\nCurrent confidence: {self.confidence:.1f}%\n\nWhat specific aspect would you like to discuss?"
+        return template.format_map({"conf": self._conf_str})
     
     def add_message(self, role: str, content: str):
         """Add message to conversation"""
@@ -311,7 +447,7 @@ CONVERSATION
     
     with col2:
         if st.button("📋 Export as JSON"):
-            chat_json = json.dumps(st.session_state.chat_messages, indent=2, default=str)
+            chat_json = json.dumps(st.session_state.chat_messages, indent=2)
             
             st.download_button(
                 label="Download JSON",
@@ -2,462 +2,394 @@
 # Guideline-aligned recommendations with clinical follow-up testing
 
 import streamlit as st
+import numpy as np
+import pandas as pd
+import importlib
 import json
+import re
+import sqlite3
+import string
+import sys
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List
+from functools import lru_cache
+from collections.abc import Mapping
+from typing import Dict, List, Union
 import os
 
-# AI-Suggested next tests database (clinical protocols)
-NEXT_TESTS_DATABASE = {
-    "Pneumonia": {
-        "immediate": [
-            {
-                "test": "CBC with differential",
-                "reason": "Assess WBC elevation, left shift",
-                "urgency": "Immediately",
-                "guideline": "WHO/NICE",
-                "cost": "$50-100"
-            },
-            {
-                "test": "Blood cultures",
-                "reason": "Identify causative organism",
-                "urgency": "Before antibiotics",
-                "guideline": "WHO",
-                "cost": "$100-150"
-            },
-            {
-                "test": "CMP (electrolytes, renal function)",
-                "reason": "Baseline renal/hepatic function",
-                "urgency": "Before treatment",
-                "guideline": "NICE",
-                "cost": "$75-120"
-            },
-            {
-                "test": "Blood gas analysis",
-                "reason": "Assess hypoxia severity",
-                "urgency": "If SpO2 <92%",
-                "guideline": "ACR",
-                "cost": "$50-80"
-            }
-        ],
-        "followup": [
-            {
-                "test": "Sputum culture",
-                "reason": "Organism identification and sensitivities",
-                "timing": "Within 24-48 hours",
-                "guideline": "WHO",
-                "cost": "$75-125"
-            },
-            {
-                "test": "Chest X-ray follow-up",
-                "reason": "Assess treatment response",
-                "timing": "7-10 days after treatment",
-                "guideline": "ACR",
-                "cost": "$100-200"
-            },
-            {
-                "test": "Repeat CBC",
-                "reason": "Monitor WBC normalization",
-                "timing": "3-5 days into treatment",
-                "guideline": "NICE",
-                "cost": "$50-100"
-            },
-            {
-                "test": "LFTs if antibiotics changed",
-                "reason": "Monitor for hepatotoxicity",
-                "timing": "If on macrolides > 5 days",
-                "guideline": "NICE",
-                "cost": "$75-100"
-            }
-        ],
-        "optional": [
-            {
-                "test": "CT chest (high-res)",
-                "reason": "If diagnosis uncertain or complications suspected",
-                "when": "If CXR inconclusive",
-                "guideline": "ACR",
-                "cost": "$500-1000"
-            },
-            {
-                "test": "Procalcitonin level",
-                "reason": "Prognostic marker for severity",
-                "when": "Consider in severe cases",
-                "guideline": "NICE",
-                "cost": "$100-200"
-            }
-        ]
-    },
-    "Brain Tumor": {
-        "immediate": [
-            {
-                "test": "MRI Brain (3T) with contrast",
-                "reason": "Confirm tumor, assess mass effect, edema",
-                "urgency": "Urgent (within 24-48h)",
-                "guideline": "NICE/ACR",
-                "cost": "$1500-3000"
-            },
-            {
-                "test": "MRI with DWI/PWI",
-                "reason": "Assess perfusion and cellularity",
-                "urgency": "Same session",
-                "guideline": "ACR",
-                "cost": "Included in MRI"
-            },
-            {
-                "test": "MR Spectroscopy",
-                "reason": "Assess metabolic activity (choline/NAA ratio)",
-                "urgency": "Same session if available",
-                "guideline": "ACR",
-                "cost": "Included in MRI"
-            },
-            {
-                "test": "CBC, BMP, LFTs",
-                "reason": "Baseline labs before surgery/chemo",
-                "urgency": "Before treatment",
-                "guideline": "WHO",
-                "cost": "$150-250"
-            }
-        ],
-        "followup": [
-            {
-                "test": "Brain biopsy/Surgical pathology",
-                "reason": "Histological diagnosis, WHO grading, molecular testing",
-                "timing": "Within 1 week of imaging",
-                "guideline": "WHO/NICE",
-                "cost": "$2000-5000"
-            },
-            {
-                "test": "Molecular testing (IDH1/IDH2, TP53, MGMT)",
-                "reason": "Prognostic markers, treatment planning",
-                "timing": "On pathology specimen",
-                "guideline": "WHO",
-                "cost": "$500-1500"
-            },
-            {
-                "test": "Post-op MRI with contrast",
-                "reason": "Assess extent of resection",
-                "timing": "48-72 hours post-surgery",
-                "guideline": "ACR",
-                "cost": "$1500-3000"
-            },
-            {
-                "test": "Monthly MRI during chemoradiation",
-                "reason": "Monitor treatment response",
-                "timing": "Throughout treatment",
-                "guideline": "NICE",
-                "cost": "$1500 x monthly"
-            }
-        ],
-        "optional": [
-            {
-                "test": "PET/CT (18F-FDG)",
-                "reason": "Assess metabolic activity if diagnosis uncertain",
-                "when": "If MRI inconclusive",
-                "guideline": "ACR",
-                "cost": "$3000-5000"
-            },
-            {
-                "test": "Neuropsychological evaluation",
-                "reason": "Baseline cognitive function",
-                "when": "Before treatment",
-                "guideline": "NICE",
-                "cost": "$1000-2000"
-            }
-        ]
+from next_tests_catalog.records import ImmediateTest, FollowupTest, OptionalTest
+
+TestRecord = Union[ImmediateTest, FollowupTest, OptionalTest]
+
+TESTS_CATALOG_PATH = "database/tests_catalog.db"
+# Bump when next_tests_catalog/ changes so existing catalogs are rebuilt
+TESTS_CATALOG_VERSION = 1
+
+# Column order of catalog rows; a record only has the time column of its category
+TEST_COLUMNS = ("test", "reason", "urgency", "timing", "when", "guideline", "cost")
+# Catalog column holding each time field ("when" is an SQL keyword)
+TIME_SQL_COLUMNS = {"urgency": "urgency", "timing": "timing", "when": "when_"}
+
+TEST_CATEGORIES = ("immediate", "followup", "optional")
+
+# How each category tab presents its tests
+CATEGORY_VIEWS = {
+    "immediate": {
+        "header": "#### ⚡ Tests to Order NOW",
+        "intro": "These tests should be ordered immediately for proper diagnosis and management",
+        "expand_first": True,
+        "time_key": "urgency",
+        "time_label": "**Urgency:** 🔴 {}",
+        "time_column": "Urgency",
+        "priority": "HIGH",
+        "submit": "✅ Order selected tests",
+        "notify": st.success,
+        "message": "✓ {test} added to order",
     },
-    "Diabetic Retinopathy": {
-        "immediate": [
-            {
-                "test": "Dilated fundus examination",
-                "reason": "Direct visualization of retinal changes",
-                "urgency": "Urgent",
-                "guideline": "WHO/NICE",
-                "cost": "$100-200"
-            },
-            {
-                "test": "Optical Coherence Tomography (OCT)",
-                "reason": "Assess macular thickness, edema",
-                "urgency": "Same visit",
-                "guideline": "NICE/ACR",
-                "cost": "$200-400"
-            },
-            {
-                "test": "Visual acuity and IOP measurement",
-                "reason": "Baseline vision, glaucoma screening",
-                "urgency": "At each visit",
-                "guideline": "WHO",
-                "cost": "$100-200"
-            },
-            {
-                "test": "Fundus photography (45-50° field)",
-                "reason": "Document baseline for comparison",
-                "urgency": "At baseline",
-                "guideline": "ACR",
-                "cost": "$100-300"
-            }
-        ],
-        "followup": [
-            {
-                "test": "OCT macula every 4 weeks if treatment initiated",
-                "reason": "Monitor response to anti-VEGF/laser",
-                "timing": "Monthly x 3, then 2-3 monthly",
-                "guideline": "NICE",
-                "cost": "$200 per visit"
-            },
-            {
-                "test": "Fluorescein angiography",
-                "reason": "Assess macular perfusion, nonperfusion areas",
-                "timing": "If macular edema suspected",
-                "guideline": "ACR",
-                "cost": "$300-500"
-            },
-            {
-                "test": "Widefield fundus imaging",
-                "reason": "Assess peripheral retina ischemia",
-                "timing": "If proliferative disease",
-                "guideline": "ACR",
-                "cost": "$200-400"
-            },
-            {
-                "test": "HbA1c every 3 months",
-                "reason": "Assess glycemic control",
-                "timing": "Every 3 months",
-                "guideline": "WHO",
-                "cost": "$50-100"
-            }
-        ],
-        "optional": [
-            {
-                "test": "Indocyanine green angiography",
-                "reason": "If fluorescein angiography inconclusive",
-                "when": "Specialized imaging only",
-                "guideline": "ACR",
-                "cost": "$500-800"
-            }
-        ]
+    "followup": {
+        "header": "#### 📅 Follow-up Testing Schedule",
+        "intro": "These tests should be scheduled based on the timeline provided",
+        "expand_first": True,
+        "time_key": "timing",
+        "time_label": "**Timing:** 📅 {}",
+        "time_column": "Timing",
+        "priority": "MEDIUM",
+        "submit": "📋 Schedule selected tests",
+        "notify": st.info,
+        "message": "⏰ {test} scheduled for {when}",
     },
-    "Tuberculosis": {
-        "immediate": [
-            {
-                "test": "Sputum smear microscopy (AFB) x3",
-                "reason": "Confirm TB diagnosis, assess infectiousness",
-                "urgency": "Within 24 hours",
-                "guideline": "WHO",
-                "cost": "$20-50"
-            },
-            {
-                "test": "Gene Xpert MTB/RIF",
-                "reason": "Rapid TB diagnosis + rifampicin resistance",
-                "urgency": "Immediately if available",
-                "guideline": "WHO",
-                "cost": "$15-20"
-            },
-            {
-                "test": "Chest X-ray (PA and lateral)",
-                "reason": "Assess extent, cavitation, complications",
-                "urgency": "Within 24-48 hours",
-                "guideline": "WHO/ACR",
-                "cost": "$50-100"
-            },
-            {
-                "test": "HIV test",
-                "reason": "HIV status affects TB management",
-                "urgency": "Mandatory",
-                "guideline": "WHO",
-                "cost": "$20-50"
-            }
-        ],
-        "followup": [
-            {
-                "test": "Drug sensitivity testing (DST)",
-                "reason": "Identify MDR-TB/XDR-TB",
-                "timing": "First positive specimen",
-                "guideline": "WHO",
-                "cost": "$50-200"
-            },
-            {
-                "test": "Monthly sputum smear microscopy x3",
-                "reason": "Monitor treatment response, time to negativity",
-                "timing": "Months 1, 2, 3",
-                "guideline": "WHO/NICE",
-                "cost": "$20 per month"
-            },
-            {
-                "test": "LFTs baseline and at month 2",
-                "reason": "Monitor hepatotoxicity from RIPE",
-                "timing": "Before treatment, 2 weeks in, month 2",
-                "guideline": "NICE",
-                "cost": "$75-100 x2"
-            },
-            {
-                "test": "End-of-treatment chest X-ray",
-                "reason": "Document treatment response",
-                "timing": "At treatment completion",
-                "guideline": "ACR",
-                "cost": "$50-100"
-            }
-        ],
-        "optional": [
-            {
-                "test": "TB-LAMP or TrueNat",
-                "reason": "Rapid TB detection if Xpert unavailable",
-                "when": "Limited resource settings",
-                "guideline": "WHO",
-                "cost": "$10-15"
-            },
-            {
-                "test": "High-res CT chest",
-                "reason": "If CXR shows atypical findings",
-                "when": "Diagnostic uncertainty",
-                "guideline": "ACR",
-                "cost": "$300-600"
-            }
-        ]
+    "optional": {
+        "header": "#### 🔬 Optional Tests",
+        "intro": "These tests may be helpful in specific clinical scenarios",
+        "expand_first": False,
+        "time_key": "when",
+        "time_label": "**When:** {}",
+        "time_column": "When",
+        "priority": "LOW",
+        "submit": "ⓘ Consider selected tests",
+        "notify": st.info,
+        "message": "💡 {test} may be useful if {when}",
     },
-    "Skin Cancer": {
-        "immediate": [
-            {
-                "test": "Full-thickness skin biopsy",
-                "reason": "Definitive histological diagnosis, staging",
-                "urgency": "Within 1-2 weeks",
-                "guideline": "WHO/NICE",
-                "cost": "$300-500"
-            },
-            {
-                "test": "Dermoscopy imaging",
-                "reason": "Document morphology for record",
-                "urgency": "At initial assessment",
-                "guideline": "ACR",
-                "cost": "$100-200"
-            },
-            {
-                "test": "CBC, BMP, LFTs",
-                "reason": "Baseline labs for staging",
-                "urgency": "Before treatment",
-                "guideline": "WHO",
-                "cost": "$150-250"
-            },
-            {
-                "test": "LDH level",
-                "reason": "Prognostic marker (elevated = worse prognosis)",
-                "urgency": "Baseline",
-                "guideline": "NICE",
-                "cost": "$50-100"
-            }
-        ],
-        "followup": [
-            {
-                "test": "Sentinel lymph node biopsy",
-                "reason": "Assess regional nodal involvement",
-                "timing": "If Breslow > 1mm or ulceration",
-                "guideline": "NICE",
-                "cost": "$3000-5000"
-            },
-            {
-                "test": "Chest X-ray baseline",
-                "reason": "Screen for pulmonary metastases",
-                "timing": "At staging",
-                "guideline": "ACR",
-                "cost": "$100-200"
-            },
-            {
-                "test": "CT chest/abdomen/pelvis if stage II-IV",
-                "reason": "Metastatic staging",
-                "timing": "If high-risk features",
-                "guideline": "ACR/NICE",
-                "cost": "$1000-2000"
-            },
-            {
-                "test": "Brain MRI if stage III-IV",
-                "reason": "Screen for brain metastases",
-                "timing": "High-risk patients",
-                "guideline": "NICE",
-                "cost": "$1500-3000"
-            }
-        ],
-        "optional": [
-            {
-                "test": "PET/CT for stage III-IV",
-                "reason": "Whole-body metabolic imaging",
-                "when": "High-risk melanoma",
-                "guideline": "ACR",
-                "cost": "$3000-5000"
-            },
-            {
-                "test": "Molecular testing (BRAF V600E, c-KIT)",
-                "reason": "Targeted therapy eligibility",
-                "when": "Stage III-IV",
-                "guideline": "WHO",
-                "cost": "$500-1500"
-            }
-        ]
-    },
-    "Dental": {
-        "immediate": [
-            {
-                "test": "Periapical radiograph",
-                "reason": "Assess bone loss, periapical pathology",
-                "urgency": "At diagnosis",
-                "guideline": "NICE/ACR",
-                "cost": "$50-100"
-            },
-            {
-                "test": "Pulp vitality testing",
-                "reason": "Assess nerve status (vital vs necrotic)",
-                "urgency": "At assessment",
-                "guideline": "WHO",
-                "cost": "$20-50"
-            },
-            {
-                "test": "Intraoral clinical photography",
-                "reason": "Document baseline condition",
-                "urgency": "At initial visit",
-                "guideline": "NICE",
-                "cost": "$50-100"
-            },
-            {
-                "test": "Probing depth assessment",
-                "reason": "Periodontal status evaluation",
-                "urgency": "At assessment",
-                "guideline": "WHO/NICE",
-                "cost": "Included in exam"
-            }
-        ],
-        "followup": [
-            {
-                "test": "Periapical follow-up at 6 months",
-                "reason": "Verify successful treatment",
-                "timing": "6 months post-treatment",
-                "guideline": "NICE/ACR",
-                "cost": "$50-100"
-            },
-            {
-                "test": "Bitewings every 24-36 months",
-                "reason": "Screen for new carious lesions",
-                "timing": "Annual or 2-year intervals",
-                "guideline": "ACR",
-                "cost": "$50-100"
-            },
-            {
-                "test": "Recall visits every 6-12 months",
-                "reason": "Preventive care, scaling/polishing",
-                "timing": "Based on risk",
-                "guideline": "WHO/NICE",
-                "cost": "$100-200 per visit"
-            }
-        ],
-        "optional": [
-            {
-                "test": "CBCT if implant planning",
-                "reason": "3D assessment of bone anatomy",
-                "when": "Complex cases",
-                "guideline": "ACR",
-                "cost": "$300-600"
-            }
-        ]
-    }
 }
 
+# "$50-100", "$200 per visit", "$75-100 x2"; anything without a dollar amount counts as $0
+COST_PATTERN = re.compile(r"\$(\d+)(?:-(\d+))?")
+
+TOTAL_COST_TEMPLATE = (
+    "Total Estimated Cost:\n"
+    "- Immediate: ${immediate[0]}-{immediate[1]}\n"
+    "- Follow-up: ${followup[0]}-{followup[1]}\n"
+    "- All costs are approximate"
+)
+
+CLINICAL_CONTEXT_MD = """
+        These test recommendations are based on:
+        
+        1. **WHO Guidelines**: International standards for diagnosis and monitoring
+        2. **NICE Guidelines**: Evidence-based best practice from National Institute
+        3. **ACR Appropriateness Criteria**: Clinical evidence ratings for imaging
+        
+        The recommended tests are designed to:
+        - Confirm diagnosis (if not yet confirmed)
+        - Stage disease appropriately
+        - Establish baseline for treatment monitoring
+        - Detect complications early
+        - Guide treatment decisions
+        - Monitor treatment response
+        
+        Not all tests apply to all patients. Clinical judgment and patient
+        presentation should guide final test ordering decisions.
+        """
+
+CATEGORY_RECORDS = {
+    "immediate": ImmediateTest,
+    "followup": FollowupTest,
+    "optional": OptionalTest,
+}
+
+# Diseases with a protocol module in next_tests_catalog/
+NEXT_TESTS_DISEASES = (
+    "Pneumonia",
+    "Brain Tumor",
+    "Diabetic Retinopathy",
+    "Tuberculosis",
+    "Skin Cancer",
+    "Dental",
+)
+NEXT_TESTS_DISEASE_SET = frozenset(NEXT_TESTS_DISEASES)
+
+# "Brain Tumor" -> "brain_tumor": catalog module name and export file name
+_DISEASE_SLUG = {disease: disease.lower().replace(" ", "_") for disease in NEXT_TESTS_DISEASES}
+
+
+class _LazyTestsDB(Mapping):
+    """NEXT_TESTS_DATABASE view that imports each disease's protocols on first access"""
+    
+    def __init__(self):
+        self._loaded = {}
+    
+    def __getitem__(self, disease: str) -> Dict[str, List[TestRecord]]:
+        data = self._loaded.get(disease)
+        if data is None:
+            slug = _DISEASE_SLUG.get(disease)
+            if slug is None:
+                raise KeyError(disease)
+            module = importlib.import_module(f"next_tests_catalog.{slug}")
+            data = self._loaded[disease] = module.DATA
+        return data
+    
+    def __iter__(self):
+        return iter(NEXT_TESTS_DISEASES)
+    
+    def __len__(self):
+        return len(NEXT_TESTS_DISEASES)
+
+
+_NEXT_TESTS_DATABASE = _LazyTestsDB()
+
+
+def __getattr__(name: str):
+    # AI-Suggested next tests database (clinical protocols), loaded per disease on demand
+    if name == "NEXT_TESTS_DATABASE":
+        return _NEXT_TESTS_DATABASE
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _seed_tests_catalog(conn: sqlite3.Connection):
+    """(Re)build the tests table from the per-disease protocol modules"""
+    rows = [
+        (
+            disease, category, ordinal, test.test, test.reason,
+            getattr(test, "urgency", None), getattr(test, "timing", None), getattr(test, "when", None),
+            test.guideline, test.cost
+        )
+        for disease, categories in _NEXT_TESTS_DATABASE.items()
+        for category, tests in categories.items()
+        for ordinal, test in enumerate(tests)
+    ]
+    
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS tests")
+        conn.execute(
+            "CREATE TABLE tests ("
+            "disease TEXT NOT NULL, category TEXT NOT NULL, ord INTEGER NOT NULL, "
+            "test TEXT NOT NULL, reason TEXT NOT NULL, urgency TEXT, timing TEXT, when_ TEXT, "
+            "guideline TEXT NOT NULL, cost TEXT NOT NULL, "
+            "PRIMARY KEY (disease, category, ord))"
+        )
+        conn.executemany("INSERT INTO tests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(f"PRAGMA user_version = {TESTS_CATALOG_VERSION}")
+
+
+@st.cache_resource(show_spinner=False)
+def _get_catalog_conn() -> sqlite3.Connection:
+    """Open the on-disk tests catalog, seeding it on first use"""
+    os.makedirs(os.path.dirname(TESTS_CATALOG_PATH), exist_ok=True)
+    
+    conn = sqlite3.connect(TESTS_CATALOG_PATH, check_same_thread=False)
+    
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version != TESTS_CATALOG_VERSION:
+        _seed_tests_catalog(conn)
+    
+    return conn
+
+
+@st.cache_resource(show_spinner=False)
+def _test_pool() -> tuple:
+    """Flyweight pool: a test shared by several diseases/categories is stored once"""
+    return {}, threading.Lock()
+
+
+def _pooled(record: TestRecord) -> TestRecord:
+    """Pooled copy of record, adding it on first sight"""
+    pool, lock = _test_pool()
+    with lock:
+        return pool.setdefault(record, record)
+
+
+@st.cache_resource(show_spinner=False)
+def _fetch_test_records(disease: str, category: str) -> tuple:
+    """Pooled test records for one disease/category in protocol order"""
+    time_column = TIME_SQL_COLUMNS[CATEGORY_VIEWS[category]["time_key"]]
+    rows = _get_catalog_conn().execute(
+        f"SELECT test, reason, {time_column}, guideline, cost "
+        "FROM tests WHERE disease = ? AND category = ? ORDER BY ord",
+        (disease, category)
+    ).fetchall()
+    
+    # Time and guideline values ("WHO", "NICE", "At diagnosis", ...) repeat a lot; intern them
+    record = CATEGORY_RECORDS[category]
+    return tuple(
+        _pooled(record(test, reason, sys.intern(when), sys.intern(guideline), cost))
+        for test, reason, when, guideline, cost in rows
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _fetch_tests(disease: str, category: str) -> Dict[str, tuple]:
+    """Tests for one disease/category in protocol order, as parallel column tuples"""
+    records = _fetch_test_records(disease, category)
+    return {name: tuple(getattr(record, name, None) for record in records) for name in TEST_COLUMNS}
+
+
+def _iter_test_order_lines(disease: str, immediate: Dict[str, tuple], followup: Dict[str, tuple]):
+    """Static blocks of the downloadable test order, with $ts and $conf left as placeholders"""
+    yield f"""
+RECOMMENDED TEST ORDER - {disease.upper()}
+========================================
+Generated: $ts
+AI Confidence: $conf%
+
+IMMEDIATE TESTS (Order Now)
+===========================
+"""
+    
+    # Costs are written as "$50-100"; escape them so they survive substitution
+    for name, reason, urgency, cost, guideline in zip(
+        immediate["test"], immediate["reason"], immediate["urgency"], immediate["cost"], immediate["guideline"]
+    ):
+        yield f"""
+□ {name}
+  Reason: {reason}
+  Urgency: {urgency}
+  Cost: {cost}
+  Guideline: {guideline}
+
+""".replace("$", "$$")
+    
+    yield "\nFOLLOW-UP TESTS\n===============\n"
+    
+    for name, timing, reason, cost in zip(
+        followup["test"], followup["timing"], followup["reason"], followup["cost"]
+    ):
+        yield f"""
+□ {name}
+  Timing: {timing}
+  Reason: {reason}
+  Cost: {cost}
+
+""".replace("$", "$$")
+
+
+def _build_test_order_template(disease: str, immediate: Dict[str, tuple], followup: Dict[str, tuple]) -> string.Template:
+    """Downloadable test order with every static line expanded; only $ts and $conf remain"""
+    return string.Template("".join(_iter_test_order_lines(disease, immediate, followup)))
+
+
+def _cost_bounds(costs: tuple) -> np.ndarray:
+    """Parse cost strings into an (n, 2) int32 array of (low, high) dollars"""
+    bounds = np.zeros((len(costs), 2), dtype=np.int32)
+    for i, cost in enumerate(costs):
+        match = COST_PATTERN.search(cost)
+        if match:
+            low = int(match.group(1))
+            bounds[i] = (low, int(match.group(2) or low))
+    return bounds
+
+
+@st.cache_resource(show_spinner=False)
+def _precompute_disease(disease: str) -> Dict:
+    """Per-disease category counts, cost totals and download template, built once per process"""
+    immediate = _fetch_tests(disease, "immediate")
+    followup = _fetch_tests(disease, "followup")
+    optional = _fetch_tests(disease, "optional")
+    
+    return {
+        "counts": (len(immediate["test"]), len(followup["test"]), len(optional["test"])),
+        "cost_text": TOTAL_COST_TEMPLATE.format(
+            immediate=_cost_bounds(immediate["cost"]).sum(axis=0),
+            followup=_cost_bounds(followup["cost"]).sum(axis=0)
+        ),
+        "template": _build_test_order_template(disease, immediate, followup),
+    }
+
+
+def _build_test_order(disease: str, confidence: float) -> str:
+    """Downloadable test order text for a disease"""
+    return _precompute_disease(disease)["template"].substitute(
+        ts=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        conf=f"{confidence:.1f}"
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _tests_frame(disease: str, category: str) -> pd.DataFrame:
+    """Overview table for one category tab"""
+    view = CATEGORY_VIEWS[category]
+    tests = _fetch_tests(disease, category)
+    return pd.DataFrame({
+        "Test": tests["test"],
+        "Guideline": tests["guideline"],
+        view["time_column"]: tests[view["time_key"]],
+        "Cost": tests["cost"],
+    })
+
+
+@lru_cache(maxsize=8)
+def _category_plan(category: str) -> tuple:
+    """Static (render_fn, args) calls that open a category tab, replayed on every rerun"""
+    view = CATEGORY_VIEWS[category]
+    return (
+        (st.markdown, (view["header"],)),
+        (st.write, (view["intro"],)),
+        (st.divider, ()),
+    )
+
+
+def _render_category(disease: str, category: str):
+    """Render one test category tab: header, selectable test table with details and the order button"""
+    view = CATEGORY_VIEWS[category]
+    tests = _fetch_tests(disease, category)
+    time_key = view["time_key"]
+    
+    for render, payload in _category_plan(category):
+        render(*payload)
+    
+    # One table: its selection shows the test details and is what gets ordered
+    event = st.dataframe(
+        _tests_frame(disease, category),
+        on_select="rerun",
+        selection_mode="multi-row",
+        hide_index=True,
+        use_container_width=True,
+        key=f"tests_{disease}_{category}"
+    )
+    
+    selected = event.selection.rows
+    if selected:
+        shown = selected
+    elif view["expand_first"] and tests["test"]:
+        shown = [0]
+    else:
+        st.caption("Select tests to see their details")
+        shown = []
+    
+    for i in shown:
+        st.markdown(f"**{tests['test'][i]}**")
+        col1, col2 = st.columns([1, 1])
+        
+        with col1:
+            st.write(f"**Reason:** {tests['reason'][i]}")
+            st.write(view["time_label"].format(tests[time_key][i]))
+            st.write(f"**Guideline:** {tests['guideline'][i]}")
+        
+        with col2:
+            st.write(f"**Estimated Cost:** {tests['cost'][i]}")
+            st.write(f"**Priority:** {view['priority']}")
+    
+    if st.button(view["submit"], key=f"order_{disease}_{category}", disabled=not selected):
+        if "ordered" not in st.session_state:
+            st.session_state["ordered"] = {}
+        st.session_state["ordered"].setdefault(disease, {})[category] = [
+            (tests["test"][i], tests[time_key][i]) for i in selected
+        ]
+    
+    # One summary banner for everything submitted, kept across reruns
+    ordered = st.session_state.get("ordered", {}).get(disease, {}).get(category)
+    if ordered:
+        view["notify"]("  \n".join(view["message"].format(test=name, when=when) for name, when in ordered))
+
 
 def show_guideline_aligned_next_tests(disease: str, confidence: float):
     """Display clinically-aligned next tests recommendations"""
@@ -468,85 +400,21 @@ def show_guideline_aligned_next_tests(disease: str, confidence: float):
         "WHO, NICE, and ACR guidelines"
     )
     
-    if disease not in NEXT_TESTS_DATABASE:
+    if disease not in NEXT_TESTS_DISEASE_SET:
         st.warning(f"⚠️ Test protocols not available for {disease}")
         return
     
     st.markdown("---")
     
-    test_data = NEXT_TESTS_DATABASE[disease]
+    precomputed = _precompute_disease(disease)
+    immediate_count, followup_count, optional_count = precomputed["counts"]
     
     # Create tabs for test categories
     tabs = st.tabs(["⚡ Immediate Tests", "📅 Follow-up Tests", "🔬 Optional Tests"])
     
-    # Immediate Tests
-    with tabs[0]:
-        st.markdown("#### ⚡ Tests to Order NOW")
-        st.write("These tests should be ordered immediately for proper diagnosis and management")
-        
-        st.divider()
-        
-        for i, test in enumerate(test_data.get("immediate", []), 1):
-            with st.expander(f"{i}. **{test['test']}** - {test['guideline']}", expanded=i==1):
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.write(f"**Reason:** {test['reason']}")
-                    st.write(f"**Urgency:** 🔴 {test['urgency']}")
-                    st.write(f"**Guideline:** {test['guideline']}")
-                
-                with col2:
-                    st.write(f"**Estimated Cost:** {test['cost']}")
-                    st.write(f"**Priority:** HIGH")
-                    
-                    if st.button(f"✅ Order {test['test']}", key=f"order_{i}"):
-                        st.success(f"✓ {test['test']} added to order")
-    
-    # Follow-up Tests
-    with tabs[1]:
-        st.markdown("#### 📅 Follow-up Testing Schedule")
-        st.write("These tests should be scheduled based on the timeline provided")
-        
-        st.divider()
-        
-        for i, test in enumerate(test_data.get("followup", []), 1):
-            with st.expander(f"{i}. **{test['test']}**", expanded=i==1):
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.write(f"**Reason:** {test['reason']}")
-                    st.write(f"**Timing:** 📅 {test['timing']}")
-                    st.write(f"**Guideline:** {test['guideline']}")
-                
-                with col2:
-                    st.write(f"**Estimated Cost:** {test['cost']}")
-                    st.write(f"**Priority:** MEDIUM")
-                    
-                    if st.button(f"📋 Schedule {test['test']}", key=f"schedule_{i}"):
-                        st.info(f"⏰ {test['test']} scheduled for {test['timing']}")
-    
-    # Optional Tests
-    with tabs[2]:
-        st.markdown("#### 🔬 Optional Tests")
-        st.write("These tests may be helpful in specific clinical scenarios")
-        
-        st.divider()
-        
-        for i, test in enumerate(test_data.get("optional", []), 1):
-            with st.expander(f"{i}. **{test['test']}**"):
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.write(f"**Reason:** {test['reason']}")
-                    st.write(f"**When:** {test['when']}")
-                    st.write(f"**Guideline:** {test['guideline']}")
-                
-                with col2:
-                    st.write(f"**Estimated Cost:** {test['cost']}")
-                    st.write(f"**Priority:** LOW")
-                    
-                    if st.button(f"ⓘ Consider {test['test']}", key=f"consider_{i}"):
-                        st.info(f"💡 {test['test']} may be useful if {test['when']}")
+    for tab, category in zip(tabs, TEST_CATEGORIES):
+        with tab:
+            _render_category(disease, category)
     
     st.markdown("---")
     
@@ -556,15 +424,12 @@ def show_guideline_aligned_next_tests(disease: str, confidence: float):
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        immediate_count = len(test_data.get("immediate", []))
         st.metric("Immediate Tests", immediate_count, "Order now")
     
     with col2:
-        followup_count = len(test_data.get("followup", []))
         st.metric("Follow-up Tests", followup_count, "Schedule by timeline")
     
     with col3:
-        optional_count = len(test_data.get("optional", []))
         st.metric("Optional Tests", optional_count, "Consider as needed")
     
     st.markdown("---")
@@ -575,57 +440,17 @@ def show_guideline_aligned_next_tests(disease: str, confidence: float):
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        test_order = f"""
-RECOMMENDED TEST ORDER - {disease.upper()}
-========================================
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-AI Confidence: {confidence:.1f}%
-
-IMMEDIATE TESTS (Order Now)
-===========================
-"""
-        
-        for test in test_data.get("immediate", []):
-            test_order += f"""
-□ {test['test']}
-  Reason: {test['reason']}
-  Urgency: {test['urgency']}
-  Cost: {test['cost']}
-  Guideline: {test['guideline']}
-
-"""
-        
-        test_order += "\nFOLLOW-UP TESTS\n===============\n"
-        
-        for test in test_data.get("followup", []):
-            test_order += f"""
-□ {test['test']}
-  Timing: {test['timing']}
-  Reason: {test['reason']}
-  Cost: {test['cost']}
-
-"""
-        
-        st.download_button(
-            label="📄 Download Test Order",
-            data=test_order,
-            file_name=f"test_order_{disease}_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
-            mime="text/plain"
-        )
+        # Only assemble the order text when the user asks for it
+        if st.button("📄 Export Test Order", key=f"export_order_{disease}"):
+            st.download_button(
+                label="Download Test Order",
+                data=_build_test_order(disease, confidence),
+                file_name=f"test_order_{_DISEASE_SLUG[disease]}_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
+                mime="text/plain"
+            )
     
     with col2:
-        # Calculate total estimated cost
-        all_tests = (
-            test_data.get("immediate", []) +
-            test_data.get("followup", [])
-        )
-        
-        total_cost_text = "Total Estimated Cost: Variable based on\n"
-        total_cost_text += "- Immediate: $500-5000 (depending on disease)\n"
-        total_cost_text += "- Follow-up: $300-3000 (dependent on imaging)\n"
-        total_cost_text += "- All costs are approximate"
-        
-        st.info(total_cost_text)
+        st.info(precomputed["cost_text"])
     
     st.markdown("---")
     
@@ -633,21 +458,4 @@ IMMEDIATE TESTS (Order Now)
     st.markdown("#### 📚 Clinical Context")
     
     with st.expander("📖 Why These Tests?"):
-        st.write("""
-        These test recommendations are based on:
-        
-        1. **WHO Guidelines**: International standards for diagnosis and monitoring
-        2. **NICE Guidelines**: Evidence-based best practice from National Institute
-        3. **ACR Appropriateness Criteria**: Clinical evidence ratings for imaging
-        
-        The recommended tests are designed to:
-        - Confirm diagnosis (if not yet confirmed)
-        - Stage disease appropriately
-        - Establish baseline for treatment monitoring
-        - Detect complications early
-        - Guide treatment decisions
-        - Monitor treatment response
-        
-        Not all tests apply to all patients. Clinical judgment and patient
-        presentation should guide final test ordering decisions.
-        """)
\ No newline at end of file
+        st.write(CLINICAL_CONTEXT_MD)
\ No newline at end of file
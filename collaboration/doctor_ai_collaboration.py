@@ -9,14 +9,48 @@ Doctor-AI Collaboration Mode
 
 import streamlit as st
 import json
+import logging
 import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 import numpy as np
-import cv2
-from PIL import Image
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
+# Accuracy histories this long are drawn with Plotly instead of st.line_chart
+PLOTLY_MIN_POINTS = 100
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _dumps(data, indent=True):
+    """Serialize to UTF-8 JSON bytes, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option, default=str)
+    
+    if indent:
+        return json.dumps(data, indent=2, default=str).encode("utf-8")
+    return json.dumps(data, separators=(',', ':'), default=str).encode("utf-8")
+
+
+def _loads(payload):
+    """Parse JSON from bytes, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
 
 class DoctorAICollaborationSystem:
     """Manages doctor feedback and incremental learning"""
@@ -29,28 +63,80 @@ class DoctorAICollaborationSystem:
             feedback_dir: Directory to store feedback data
         """
         self.feedback_dir = Path(feedback_dir)
-        self.feedback_dir.mkdir(exist_ok=True)
         
-        # Create subdirectories
-        (self.feedback_dir / "corrections").mkdir(exist_ok=True)
-        (self.feedback_dir / "annotations").mkdir(exist_ok=True)
-        (self.feedback_dir / "learning_log").mkdir(exist_ok=True)
-        (self.feedback_dir / "metrics").mkdir(exist_ok=True)
+        # Create the directory with its subdirectories
+        for subdir in ("corrections", "annotations", "learning_log", "metrics"):
+            os.makedirs(self.feedback_dir / subdir, exist_ok=True)
         
-        self.corrections_file = self.feedback_dir / "corrections" / "corrections.json"
-        self.learning_log_file = self.feedback_dir / "learning_log" / "learning_log.json"
+        # Corrections and learning events are append-only JSON lines
+        self.corrections_file = self.feedback_dir / "corrections" / "corrections.jsonl"
+        self.learning_log_file = self.feedback_dir / "learning_log" / "learning_log.jsonl"
         self.metrics_file = self.feedback_dir / "metrics" / "metrics.json"
         
+        # Whole-file stores from before the JSONL switch, imported once
+        self.legacy_corrections_file = self.feedback_dir / "corrections" / "corrections.json"
+        self.legacy_learning_log_file = self.feedback_dir / "learning_log" / "learning_log.json"
+        
+        # Machine-read stores are written without indentation
+        self._compact_files = {self.metrics_file}
+        
+        # Open append handles for the JSONL stores, keyed by file
+        self._appenders = {}
+        
+        # Pending writes while inside _batched_writes(), keyed by file
+        self._dirty = None
+        
+        # One instance is shared by every session (see _get_system)
+        self._lock = threading.Lock()
+        
         # Initialize files if they don't exist
         self._initialize_files()
+        
+        # Keep the stores in memory; submits update them and the running counters
+        corrections = self._load_jsonl(self.corrections_file)
+        sessions = self._load_jsonl(self.learning_log_file)
+        self._corrections = {"total": len(corrections), "corrections": corrections}
+        self._learning_log = {"sessions": sessions, "total_learned": len(sessions)}
+        self._metrics = self._load_json(self.metrics_file)
+        
+        # Learning events in display form for the dashboard table
+        self._sessions_df = self._sessions_frame(sessions)
+        
+        # Accuracy history as growable arrays for charting
+        history = self._metrics.get("accuracy", [])
+        self._acc_times = np.array([h["timestamp"] for h in history], dtype="datetime64[us]")
+        self._acc_vals = np.array([h["accuracy"] for h in history], dtype=np.float32)
+        self._acc_len = len(history)
+        
+        # (feedback count, data, file) of the most recent export
+        self._last_export = None
+        
+        # Corrections as a DataFrame, rebuilt lazily after new feedback
+        self._corrections_df = None
+        
+        self._total_count = len(self._corrections["corrections"])
+        self._correct_count = sum(1 for c in self._corrections["corrections"] if c["agreement"])
+        
+        # Same running counts for the learning log and the agreement history, which are
+        # separate files and need not line up with the corrections one-to-one
+        self._confirmed_count = sum(1 for s in sessions if s["correction_type"] == "CONFIRMED")
+        self._agreement_count = sum(1 for a in self._metrics.get("doctor_agreement", []) if a["agreement"])
+        
+        # Correction insights, kept up to date on every submit
+        self._diagnosis_counter = Counter()
+        self._confidence_patterns = []
+        for correction in corrections:
+            self._track_insights(correction)
     
     def _initialize_files(self):
         """Initialize JSON files if they don't exist"""
         if not self.corrections_file.exists():
-            self._save_json(self.corrections_file, {"total": 0, "corrections": []})
+            legacy = self._load_json(self.legacy_corrections_file)
+            self._write_jsonl(self.corrections_file, legacy.get("corrections", []))
         
         if not self.learning_log_file.exists():
-            self._save_json(self.learning_log_file, {"sessions": [], "total_learned": 0})
+            legacy = self._load_json(self.legacy_learning_log_file)
+            self._write_jsonl(self.learning_log_file, legacy.get("sessions", []))
         
         if not self.metrics_file.exists():
             self._save_json(self.metrics_file, {
@@ -62,21 +148,96 @@ class DoctorAICollaborationSystem:
     def _load_json(self, filepath):
         """Load JSON file safely"""
         try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
+            return _loads(filepath.read_bytes())
         except:
             return {}
     
     def _save_json(self, filepath, data):
-        """Save JSON file safely"""
+        """Save JSON file safely (deferred while batching)"""
+        if self._dirty is not None:
+            self._dirty[filepath] = data
+            return True
+        
+        return self._write_json(filepath, data)
+    
+    def _write_json(self, filepath, data):
+        """Write JSON file to disk"""
         try:
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
+            self._replace_file(filepath, _dumps(data, indent=filepath not in self._compact_files))
             return True
-        except Exception as e:
-            print(f"Error saving JSON: {e}")
+        except Exception:
+            logger.exception("Could not write JSON file %s", filepath)
             return False
     
+    def _replace_file(self, filepath, payload):
+        """Write payload to a temp file and rename it over filepath, so a crash never truncates it"""
+        tmp = filepath.with_suffix(filepath.suffix + ".tmp")
+        tmp.write_bytes(payload)
+        os.replace(tmp, filepath)
+    
+    def _load_jsonl(self, filepath):
+        """Load JSON lines file safely, skipping lines that do not decode"""
+        records = []
+        try:
+            with open(filepath, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(_loads(line))
+                    except ValueError:
+                        # Torn last line from an interrupted write
+                        logger.warning("Skipping undecodable line in %s", filepath)
+                        continue
+        except OSError:
+            logger.exception("Could not read JSON lines file %s", filepath)
+        return records
+    
+    def _write_jsonl(self, filepath, records):
+        """Write records as JSON lines, replacing the file"""
+        try:
+            self._replace_file(filepath, b"".join(_dumps(record, indent=False) + b"\n" for record in records))
+            return True
+        except Exception:
+            logger.exception("Could not write JSON lines file %s", filepath)
+            return False
+    
+    def _append_jsonl(self, filepath, record):
+        """Append one record to a JSON lines file"""
+        try:
+            f = self._appenders.get(filepath)
+            if f is None:
+                f = self._appenders[filepath] = open(filepath, 'ab', buffering=1 << 17)
+                
+                # Start on a fresh line if the file ends in a torn record
+                if f.tell():
+                    with open(filepath, "rb") as tail:
+                        tail.seek(-1, os.SEEK_END)
+                        if tail.read(1) != b"\n":
+                            f.write(b"\n")
+            f.write(_dumps(record, indent=False) + b"\n")
+            
+            # Inside _batched_writes() the flush happens once on exit
+            if self._dirty is None:
+                f.flush()
+            return True
+        except Exception:
+            logger.exception("Could not append record to %s", filepath)
+            return False
+    
+    @contextmanager
+    def _batched_writes(self):
+        """Group _save_json calls so each dirty file is written once on exit"""
+        self._dirty = {}
+        try:
+            yield
+        finally:
+            dirty, self._dirty = self._dirty, None
+            for filepath, data in dirty.items():
+                self._write_json(filepath, data)
+            for f in self._appenders.values():
+                f.flush()
+    
     def submit_feedback(self, image_name, model_prediction, model_confidence, 
                        doctor_approval, doctor_diagnosis, annotations=None):
         """
@@ -94,9 +255,11 @@ class DoctorAICollaborationSystem:
             Feedback ID and confirmation
         """
         
+        now = datetime.now()
+        
         feedback_data = {
-            "id": f"FB_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "timestamp": datetime.now().isoformat(),
+            "id": f"FB_{now.strftime('%Y%m%d_%H%M%S')}",
+            "timestamp": now.isoformat(),
             "image_name": str(image_name),
             "model_prediction": str(model_prediction),
             "model_confidence": float(model_confidence),
@@ -106,25 +269,30 @@ class DoctorAICollaborationSystem:
             "annotations": annotations or {}
         }
         
-        # Load existing corrections
-        data = self._load_json(self.corrections_file)
-        data["corrections"].append(feedback_data)
-        data["total"] = len(data["corrections"])
-        
-        # Save updated corrections
-        self._save_json(self.corrections_file, data)
-        
-        # Log for learning
-        self._log_learning_event(feedback_data)
-        
-        # Update metrics
-        self._update_metrics(feedback_data)
+        with self._lock, self._batched_writes():
+            # Append to the cached corrections
+            data = self._corrections
+            data["corrections"].append(feedback_data)
+            data["total"] = len(data["corrections"])
+            
+            self._total_count += 1
+            self._correct_count += int(feedback_data["agreement"])
+            self._track_insights(feedback_data)
+            
+            # Save the new correction
+            self._append_jsonl(self.corrections_file, feedback_data)
+            
+            # Log for learning
+            self._log_learning_event(feedback_data)
+            
+            # Update metrics
+            self._update_metrics(feedback_data)
         
         return feedback_data["id"], True
     
     def _log_learning_event(self, feedback_data):
         """Log feedback event for learning"""
-        log_data = self._load_json(self.learning_log_file)
+        log_data = self._learning_log
         
         learning_event = {
             "feedback_id": feedback_data["id"],
@@ -137,8 +305,26 @@ class DoctorAICollaborationSystem:
         
         log_data["sessions"].append(learning_event)
         log_data["total_learned"] = len(log_data["sessions"])
+        self._confirmed_count += learning_event["correction_type"] == "CONFIRMED"
+        
+        event_df = self._sessions_frame([learning_event])
+        if self._sessions_df.empty:
+            self._sessions_df = event_df
+        else:
+            self._sessions_df = pd.concat([self._sessions_df, event_df], ignore_index=True)
         
-        self._save_json(self.learning_log_file, log_data)
+        self._append_jsonl(self.learning_log_file, learning_event)
+    
+    def _sessions_frame(self, sessions):
+        """Build the learning events table with parsed timestamps"""
+        df = pd.DataFrame(sessions, columns=["timestamp", "image_name", "correction_type", "ai_was_correct"])
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+        df.columns = ["Timestamp", "Image", "Type", "AI Correct"]
+        return df
+    
+    def get_recent_learning_events(self, n=10):
+        """Get the last n learning events as a DataFrame"""
+        return self._sessions_df.tail(n)
     
     def _determine_correction_type(self, feedback_data):
         """Determine type of correction"""
@@ -149,38 +335,58 @@ class DoctorAICollaborationSystem:
     
     def _update_metrics(self, feedback_data):
         """Update system metrics"""
-        metrics = self._load_json(self.metrics_file)
+        metrics = self._metrics
+        timestamp = feedback_data["timestamp"]
         
-        # Calculate accuracy
-        corrections = self._load_json(self.corrections_file)["corrections"]
-        if corrections:
-            correct_count = sum(1 for c in corrections if c["agreement"])
-            accuracy = (correct_count / len(corrections)) * 100
+        # Calculate accuracy from the running counters
+        if self._total_count:
+            accuracy = (self._correct_count / self._total_count) * 100
             metrics["accuracy"].append({
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "accuracy": accuracy,
-                "total_feedback": len(corrections)
+                "total_feedback": self._total_count
             })
+            self._append_accuracy_point(timestamp, accuracy)
         
         # Doctor agreement rate
         doctor_agreement = feedback_data["agreement"]
         metrics["doctor_agreement"].append({
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "agreement": doctor_agreement
         })
+        self._agreement_count += bool(doctor_agreement)
         
         self._save_json(self.metrics_file, metrics)
     
+    def _append_accuracy_point(self, timestamp, accuracy):
+        """Append to the accuracy arrays, doubling their capacity when full"""
+        n = self._acc_len
+        
+        if n == len(self._acc_vals):
+            capacity = max(16, 2 * n)
+            times = np.empty(capacity, dtype="datetime64[us]")
+            vals = np.empty(capacity, dtype=np.float32)
+            times[:n] = self._acc_times[:n]
+            vals[:n] = self._acc_vals[:n]
+            self._acc_times, self._acc_vals = times, vals
+        
+        self._acc_times[n] = np.datetime64(timestamp)
+        self._acc_vals[n] = accuracy
+        self._acc_len = n + 1
+    
+    def get_accuracy_series(self):
+        """Get accuracy history as (timestamps, values) arrays"""
+        return self._acc_times[:self._acc_len], self._acc_vals[:self._acc_len]
+    
     def get_corrections_summary(self):
         """Get summary of all corrections"""
-        data = self._load_json(self.corrections_file)
+        corrections = self._corrections["corrections"]
         
-        if not data["corrections"]:
+        if not corrections:
             return None
         
-        corrections = data["corrections"]
-        total = len(corrections)
-        agreed = sum(1 for c in corrections if c["agreement"])
+        total = self._total_count
+        agreed = self._correct_count
         disagreed = total - agreed
         
         return {
@@ -193,25 +399,24 @@ class DoctorAICollaborationSystem:
     
     def get_learning_summary(self):
         """Get summary of learning progress"""
-        log_data = self._load_json(self.learning_log_file)
+        log_data = self._learning_log
         
         if not log_data["sessions"]:
             return None
         
-        sessions = log_data["sessions"]
-        confirmed = sum(1 for s in sessions if s["correction_type"] == "CONFIRMED")
-        corrected = sum(1 for s in sessions if s["correction_type"] == "CORRECTED")
+        total = len(log_data["sessions"])
+        confirmed = self._confirmed_count
         
         return {
             "total_learned": log_data["total_learned"],
             "confirmed": confirmed,
-            "corrected": corrected,
-            "learning_efficiency": (confirmed / len(sessions) * 100) if sessions else 0
+            "corrected": total - confirmed,
+            "learning_efficiency": (confirmed / total * 100) if total else 0
         }
     
     def get_accuracy_metrics(self):
         """Get accuracy improvement metrics"""
-        metrics = self._load_json(self.metrics_file)
+        metrics = self._metrics
         
         if not metrics["accuracy"]:
             return None
@@ -234,68 +439,143 @@ class DoctorAICollaborationSystem:
     
     def get_doctor_agreement_rate(self):
         """Get doctor agreement rate"""
-        metrics = self._load_json(self.metrics_file)
+        metrics = self._metrics
         
         if not metrics["doctor_agreement"]:
             return 0
         
-        agreements = [a["agreement"] for a in metrics["doctor_agreement"]]
-        return (sum(agreements) / len(agreements)) * 100
+        return (self._agreement_count / len(metrics["doctor_agreement"])) * 100
     
     def export_learning_data(self):
-        """Export all learning data for model retraining"""
-        corrections = self._load_json(self.corrections_file).get("corrections", [])
+        """
+        Export all learning data for model retraining
+        
+        Returns:
+            (training data, export file); the file is None if it could not be written
+        """
+        corrections = self._corrections.get("corrections", [])
         
         if not corrections:
             # Return None tuple to indicate no data
             return None, None
         
+        # Reuse the last export while no new feedback has arrived
+        if self._last_export is not None:
+            count, training_data, export_file = self._last_export
+            if count == self._total_count and export_file.exists():
+                return training_data, export_file
+        
+        now = datetime.now()
+        
         # Format data for retraining
         training_data = {
-            "timestamp": datetime.now().isoformat(),
-            "total_samples": len(corrections),
+            "timestamp": now.isoformat(),
+            "total_samples": self._total_count,
             "corrections": corrections,
             "summary": {
-                "total": len(corrections),
-                "correct_ai": sum(1 for c in corrections if c["agreement"]),
-                "corrected_ai": sum(1 for c in corrections if not c["agreement"])
+                "total": self._total_count,
+                "correct_ai": self._correct_count,
+                "corrected_ai": self._total_count - self._correct_count
             }
         }
         
         # Save export
-        export_file = self.feedback_dir / "learning_log" / f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        self._save_json(export_file, training_data)
+        export_file = self.feedback_dir / "learning_log" / f"export_{now.strftime('%Y%m%d_%H%M%S')}.json"
+        if not self._save_json(export_file, training_data):
+            return training_data, None
+        
+        self._last_export = (self._total_count, training_data, export_file)
         
         return training_data, export_file
     
     def get_correction_insights(self):
         """Get insights about common correction patterns"""
-        corrections = self._load_json(self.corrections_file)["corrections"]
-        
-        if not corrections:
+        if not self._corrections["corrections"]:
             return None
         
-        # Analyze patterns
         insights = {
             "most_corrected": {},
-            "doctor_diagnoses": {},
-            "confidence_patterns": []
+            "doctor_diagnoses": dict(self._diagnosis_counter),
+            "confidence_patterns": list(self._confidence_patterns)
         }
         
-        for correction in corrections:
-            # Track which diagnoses are most corrected
-            diagnosis = correction["doctor_diagnosis"]
-            insights["doctor_diagnoses"][diagnosis] = insights["doctor_diagnoses"].get(diagnosis, 0) + 1
-            
-            # Track confidence patterns
-            if not correction["agreement"]:
-                insights["confidence_patterns"].append({
-                    "model_confidence": correction["model_confidence"],
-                    "ai_prediction": correction["model_prediction"],
-                    "correct_diagnosis": correction["doctor_diagnosis"]
-                })
-        
         return insights
+    
+    def _track_insights(self, correction):
+        """Fold one correction into the diagnosis counts and confidence patterns"""
+        # Track which diagnoses are most corrected
+        self._diagnosis_counter[correction["doctor_diagnosis"]] += 1
+        
+        # Track confidence patterns
+        if not correction["agreement"]:
+            self._confidence_patterns.append({
+                "model_confidence": correction["model_confidence"],
+                "ai_prediction": correction["model_prediction"],
+                "correct_diagnosis": correction["doctor_diagnosis"]
+            })
+    
+    def get_corrections_count(self):
+        """Get number of corrections submitted so far"""
+        return self._total_count
+    
+    def get_corrections_dataframe(self):
+        """Get all corrections as a DataFrame (cached until the next submit)"""
+        corrections = self._corrections["corrections"]
+        
+        if self._corrections_df is None or len(self._corrections_df) != len(corrections):
+            self._corrections_df = pd.DataFrame(corrections)
+        
+        return self._corrections_df
+
+
+@lru_cache(maxsize=4)
+def _get_system(feedback_dir):
+    """Collaboration system for a feedback directory, created once per process"""
+    return DoctorAICollaborationSystem(feedback_dir=feedback_dir)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _dashboard_summaries(_collab_system, feedback_count, feedback_dir):
+    """Learning, corrections and accuracy summaries; recomputed only after new feedback"""
+    return (
+        _collab_system.get_learning_summary(),
+        _collab_system.get_corrections_summary(),
+        _collab_system.get_accuracy_metrics()
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _accuracy_figure(feedback_count, feedback_dir, _times, _values):
+    """Accuracy trend chart for a given amount of feedback"""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=_times,
+        y=_values,
+        mode='lines+markers',
+        name='Accuracy',
+        line=dict(color='#00d4aa', width=3),
+        marker=dict(size=8)
+    ))
+    
+    fig.update_layout(
+        title="AI Accuracy Over Time",
+        xaxis_title="Time",
+        yaxis_title="Accuracy (%)",
+        hovermode="x unified",
+        height=400,
+        template="plotly_dark"
+    )
+    
+    return fig
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _corrections_csv(_collab_system, feedback_count, feedback_dir):
+    """CSV bytes of all corrections for a given amount of feedback"""
+    return _collab_system.get_corrections_dataframe().to_csv(index=False).encode("utf-8")
 
 
 def create_annotation_canvas(image, image_name):
@@ -363,9 +643,7 @@ def render_collaboration_mode(model_prediction, model_confidence, image, image_n
     """
     
     # Initialize collaboration system
-    collab_system = DoctorAICollaborationSystem(
-        feedback_dir="feedback_system"
-    )
+    collab_system = _get_system("feedback_system")
     
     st.markdown("---")
     st.markdown("## 👨‍⚕️ Doctor-AI Collaboration Mode")
@@ -509,7 +787,12 @@ def render_collaboration_mode(model_prediction, model_confidence, image, image_n
     with collab_tabs[1]:
         st.markdown("### 📚 Learning Progress Dashboard")
         
-        learning_summary = collab_system.get_learning_summary()
+        # Summaries only change when feedback is added, so key them on the count
+        feedback_count = collab_system.get_corrections_count()
+        feedback_dir = str(collab_system.feedback_dir)
+        learning_summary, corrections_summary, accuracy_metrics = _dashboard_summaries(
+            collab_system, feedback_count, feedback_dir
+        )
         
         if learning_summary:
             metric_cols = st.columns(4)
@@ -548,15 +831,8 @@ def render_collaboration_mode(model_prediction, model_confidence, image, image_n
             # Learning timeline
             st.markdown("### 📅 Recent Learning Events")
             
-            log_data = collab_system._load_json(collab_system.learning_log_file)
-            if log_data["sessions"]:
-                # Create DataFrame
-                sessions = log_data["sessions"][-10:]  # Last 10
-                df = pd.DataFrame(sessions)
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
-                df = df[["timestamp", "image_name", "correction_type", "ai_was_correct"]]
-                df.columns = ["Timestamp", "Image", "Type", "AI Correct"]
-                
+            df = collab_system.get_recent_learning_events(10)
+            if not df.empty:
                 st.dataframe(df, use_container_width=True)
         else:
             st.info("📊 No learning data yet. Submit feedback to start the learning process!")
@@ -565,8 +841,6 @@ def render_collaboration_mode(model_prediction, model_confidence, image, image_n
     with collab_tabs[2]:
         st.markdown("### 📈 System Performance Metrics")
         
-        corrections_summary = collab_system.get_corrections_summary()
-        
         if corrections_summary:
             perf_cols = st.columns(4)
             
@@ -598,34 +872,22 @@ def render_collaboration_mode(model_prediction, model_confidence, image, image_n
             st.markdown("---")
             
             # Accuracy over time
-            accuracy_metrics = collab_system.get_accuracy_metrics()
             if accuracy_metrics and accuracy_metrics["history"]:
                 st.markdown("### 📊 Accuracy Trend")
                 
-                import plotly.graph_objects as go
-                
-                history = accuracy_metrics["history"]
-                fig = go.Figure()
-                
-                fig.add_trace(go.Scatter(
-                    x=[h["timestamp"] for h in history],
-                    y=[h["accuracy"] for h in history],
-                    mode='lines+markers',
-                    name='Accuracy',
-                    line=dict(color='#00d4aa', width=3),
-                    marker=dict(size=8)
-                ))
+                acc_times, acc_values = collab_system.get_accuracy_series()
                 
-                fig.update_layout(
-                    title="AI Accuracy Over Time",
-                    xaxis_title="Time",
-                    yaxis_title="Accuracy (%)",
-                    hovermode="x unified",
-                    height=400,
-                    template="plotly_dark"
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+                # Short histories use the native chart and skip loading Plotly
+                if len(acc_values) < PLOTLY_MIN_POINTS:
+                    st.line_chart(
+                        pd.Series(acc_values, index=acc_times, name="Accuracy"),
+                        x_label="Time",
+                        y_label="Accuracy (%)",
+                        color="#00d4aa"
+                    )
+                else:
+                    fig = _accuracy_figure(feedback_count, feedback_dir, acc_times, acc_values)
+                    st.plotly_chart(fig, use_container_width=True)
                 
                 st.markdown("---")
                 
@@ -663,46 +925,61 @@ def render_collaboration_mode(model_prediction, model_confidence, image, image_n
             "with the corrections and feedback from doctors."
         )
         
-        export_data, export_file = collab_system.export_learning_data()
-        
-        if export_data is not None and export_file is not None:
+        if corrections_summary:
             col_exp1, col_exp2 = st.columns(2)
             
             with col_exp1:
                 st.markdown("### 📊 Export Summary")
                 st.markdown(f"""
-                - **Total Samples**: {export_data['summary']['total']}
-                - **AI Correct**: {export_data['summary']['correct_ai']}
-                - **AI Incorrect**: {export_data['summary']['corrected_ai']}
-                - **Accuracy**: {(export_data['summary']['correct_ai'] / export_data['summary']['total'] * 100):.1f}%
+                - **Total Samples**: {corrections_summary['total_feedback']}
+                - **AI Correct**: {corrections_summary['agreed']}
+                - **AI Incorrect**: {corrections_summary['disagreed']}
+                - **Accuracy**: {corrections_summary['agreement_rate']:.1f}%
                 """)
             
             with col_exp2:
                 st.markdown("### 💾 Download Options")
                 
-                # JSON export
-                json_str = json.dumps(export_data, indent=2, default=str)
-                st.download_button(
-                    "📥 Download as JSON",
-                    json_str,
-                    f"learning_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    "application/json"
-                )
+                # Only write the export file and build downloads once the user asks for them
+                if st.button("📦 Export Learning Data", key="export_learning_data_btn"):
+                    st.session_state["show_download"] = True
                 
-                # CSV export
-                corrections_df = pd.DataFrame(export_data["corrections"])
-                csv_str = corrections_df.to_csv(index=False)
-                st.download_button(
-                    "📊 Download as CSV",
-                    csv_str,
-                    f"corrections_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    "text/csv"
-                )
+                if st.session_state.get("show_download"):
+                    export_data, export_file = collab_system.export_learning_data()
+                    
+                    # JSON export: serve the export file on disk
+                    try:
+                        export_bytes = export_file.read_bytes() if export_file is not None else None
+                    except OSError:
+                        logger.exception("Could not read learning data export %s", export_file)
+                        export_bytes = None
+                    
+                    if export_bytes is None:
+                        st.error("Could not write the learning data export. Please try again.")
+                    else:
+                        st.download_button(
+                            "📥 Download as JSON",
+                            export_bytes,
+                            f"learning_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                            "application/json"
+                        )
+                    
+                    # CSV export
+                    st.download_button(
+                        "📊 Download as CSV",
+                        _corrections_csv(
+                            collab_system,
+                            collab_system.get_corrections_count(),
+                            str(collab_system.feedback_dir)
+                        ),
+                        f"corrections_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        "text/csv"
+                    )
             
             st.markdown("---")
             
             st.markdown("### 📋 Recent Corrections")
-            corrections_df = pd.DataFrame(export_data["corrections"][-10:])
+            corrections_df = collab_system.get_corrections_dataframe().tail(10)
             st.dataframe(
                 corrections_df[["timestamp", "image_name", "model_prediction", "doctor_diagnosis", "agreement"]],
                 use_container_width=True
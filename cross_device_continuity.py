@@ -3,59 +3,243 @@
 
 import streamlit as st
 import json
+import logging
 import os
 from datetime import datetime, timedelta
 import hashlib
-import uuid
+import secrets
+import heapq
+import mmap
+import threading
+from collections import defaultdict
 import base64
+from functools import lru_cache
 from io import BytesIO
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
-# QR Code generation
 try:
-    import qrcode
-    from PIL import Image
-    QR_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    QR_AVAILABLE = False
-    st.warning("Install qrcode for QR functionality: pip install qrcode[pil]")
+    ORJSON_AVAILABLE = False
+
+# QR backends (segno/qrcode + PIL) and ijson are imported on first use, see
+# _ensure_qr() / _ensure_ijson(); None means "not checked yet"
+SEGNO_AVAILABLE = False
+QR_AVAILABLE = None
+IJSON_AVAILABLE = None
 
 SCAN_SESSIONS_PATH = "database/scan_sessions.json"
+# Append-only change log replayed over the snapshot; one {"id", "s"} line per session write
+SCAN_SESSIONS_LOG_PATH = "database/scan_sessions.log"
 DEVICE_REGISTRY_PATH = "database/device_registry.json"
 
+# Fold the change log into the snapshot once it grows past this many lines
+SESSIONS_LOG_COMPACT_LINES = 500
+
+# Snapshots larger than this are parsed incrementally with ijson (when installed)
+SESSIONS_STREAM_BYTES = 1 << 20
+
+# Most recent QR scan events kept per session
+QR_SCAN_HISTORY = 50
+
+APP_DOWNLOAD_URL = "https://mediaiapp.streamlit.app/"
+
+# QR codes are framed with the app accent color (#00d4aa)
+QR_BORDER_RGB = (0, 212, 170)
+
+_session_log_lines = 0
+
+# Set once init_continuity_db() has run in this process
+_db_ready = False
+
+# Last parsed sessions, keyed by the snapshot and log file signatures
+_sessions_cache = {"signature": None, "data": None, "lines": 0}
+
+
+def _dumps(data, indent: bool = False) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option, default=str)
+    
+    if indent:
+        return json.dumps(data, indent=2, default=str).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _loads(payload):
+    """Parse JSON from bytes or str, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _ensure_qr() -> bool:
+    """Import the QR backends on first call and report whether QR codes are available"""
+    global segno, qrcode, Image, SEGNO_AVAILABLE, QR_AVAILABLE
+    
+    if QR_AVAILABLE is not None:
+        return QR_AVAILABLE
+    
+    # segno is much faster when installed, qrcode is the fallback
+    try:
+        import segno
+        SEGNO_AVAILABLE = True
+    except ImportError:
+        SEGNO_AVAILABLE = False
+    
+    try:
+        if not SEGNO_AVAILABLE:
+            import qrcode
+        from PIL import Image
+        QR_AVAILABLE = True
+    except ImportError:
+        QR_AVAILABLE = False
+        st.warning("Install qrcode for QR functionality: pip install qrcode[pil]")
+    
+    return QR_AVAILABLE
+
+
+def _ensure_ijson() -> bool:
+    """Import ijson on first call and report whether it is installed"""
+    global ijson, IJSON_AVAILABLE
+    
+    if IJSON_AVAILABLE is None:
+        try:
+            import ijson
+            IJSON_AVAILABLE = True
+        except ImportError:
+            IJSON_AVAILABLE = False
+    
+    return IJSON_AVAILABLE
+
 
 def init_continuity_db():
     """Initialize cross-device continuity database"""
     os.makedirs("database", exist_ok=True)
     
     if not os.path.exists(SCAN_SESSIONS_PATH):
-        with open(SCAN_SESSIONS_PATH, "w") as f:
-            json.dump({}, f)
+        with open(SCAN_SESSIONS_PATH, "wb") as f:
+            f.write(b"{}")
     
     if not os.path.exists(DEVICE_REGISTRY_PATH):
-        with open(DEVICE_REGISTRY_PATH, "w") as f:
-            json.dump({}, f)
+        with open(DEVICE_REGISTRY_PATH, "wb") as f:
+            f.write(b"{}")
+
+
+def _file_signature(path):
+    """(inode, mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
 
 def load_scan_sessions():
-    """Load all scan sessions"""
-    if not os.path.exists(SCAN_SESSIONS_PATH):
-        return {}
+    """Load all scan sessions (snapshot plus replayed change log)"""
+    global _session_log_lines
     
-    try:
-        with open(SCAN_SESSIONS_PATH, "r") as f:
-            return json.load(f)
-    except:
-        return {}
+    # Neither file changed since the last load: reuse the parsed sessions
+    signature = (_file_signature(SCAN_SESSIONS_PATH), _file_signature(SCAN_SESSIONS_LOG_PATH))
+    if _sessions_cache["data"] is not None and _sessions_cache["signature"] == signature:
+        _session_log_lines = _sessions_cache["lines"]
+        return _sessions_cache["data"]
+    
+    sessions = {}
+    
+    if signature[0] is not None:
+        try:
+            with open(SCAN_SESSIONS_PATH, "rb") as f:
+                if signature[0][2] > SESSIONS_STREAM_BYTES and _ensure_ijson():
+                    # Build the dict session by session without holding the whole file
+                    sessions = dict(ijson.kvitems(f, "", use_float=True))
+                else:
+                    # Parse straight from the page cache; orjson reads the mapping in place
+                    # (the view is released before the mapping closes, also when parsing fails)
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                        sessions = _loads(view if ORJSON_AVAILABLE else view.tobytes())
+        except (OSError, ValueError):
+            logger.exception("Could not read session snapshot %s", SCAN_SESSIONS_PATH)
+            sessions = {}
+    
+    lines = 0
+    if signature[1] is not None:
+        try:
+            with open(SCAN_SESSIONS_LOG_PATH, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        delta = _loads(line)
+                    except ValueError:
+                        # Torn last line from an interrupted write
+                        continue
+                    sessions[delta["id"]] = delta["s"]
+                    lines += 1
+        except OSError:
+            logger.exception("Could not read session log %s", SCAN_SESSIONS_LOG_PATH)
+    
+    _session_log_lines = lines
+    _sessions_cache.update(signature=signature, data=sessions, lines=lines)
+    return sessions
+
+
+def _replace_file(path, payload):
+    """Write payload to a temp file and rename it over path, so a crash never truncates it"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
 
 
 def save_scan_sessions(sessions):
-    """Save scan sessions"""
+    """Save scan sessions snapshot"""
+    try:
+        _replace_file(SCAN_SESSIONS_PATH, _dumps(sessions))
+        return True
+    except Exception:
+        logger.exception("Could not save session snapshot %s", SCAN_SESSIONS_PATH)
+        return False
+
+
+def append_session_delta(session_id: str, session: dict) -> bool:
+    """Append the latest state of one session to the change log"""
+    global _session_log_lines
+    
     try:
-        with open(SCAN_SESSIONS_PATH, "w") as f:
-            json.dump(sessions, f, indent=4, default=str)
+        with open(SCAN_SESSIONS_LOG_PATH, "ab", buffering=8192) as f:
+            f.write(_dumps({"id": session_id, "s": session}) + b"\n")
+        _session_log_lines += 1
         return True
-    except Exception as e:
-        print(f"Error saving sessions: {e}")
+    except (OSError, ValueError):
+        logger.exception("Could not append session %s to %s", session_id, SCAN_SESSIONS_LOG_PATH)
+        return False
+
+
+def compact_sessions(sessions, force: bool = False) -> bool:
+    """Fold the change log into the snapshot once it is long enough"""
+    global _session_log_lines
+    
+    if not force and _session_log_lines <= SESSIONS_LOG_COMPACT_LINES:
+        return True
+    
+    # Replaying the log over the new snapshot is idempotent, so truncate only once
+    # the new snapshot has replaced the old one
+    if not save_scan_sessions(sessions):
+        return False
+    
+    try:
+        open(SCAN_SESSIONS_LOG_PATH, "w").close()
+        _session_log_lines = 0
+        return True
+    except OSError:
+        logger.exception("Could not truncate session log %s", SCAN_SESSIONS_LOG_PATH)
         return False
 
 
@@ -65,8 +249,8 @@ def load_devices():
         return {}
     
     try:
-        with open(DEVICE_REGISTRY_PATH, "r") as f:
-            return json.load(f)
+        with open(DEVICE_REGISTRY_PATH, "rb") as f:
+            return _loads(f.read())
     except:
         return {}
 
@@ -74,49 +258,70 @@ def load_devices():
 def save_devices(devices):
     """Save registered devices"""
     try:
-        with open(DEVICE_REGISTRY_PATH, "w") as f:
-            json.dump(devices, f, indent=4)
+        with open(DEVICE_REGISTRY_PATH, "wb") as f:
+            f.write(_dumps(devices))
         return True
-    except Exception as e:
-        print(f"Error saving devices: {e}")
+    except (OSError, ValueError):
+        logger.exception("Could not save device registry %s", DEVICE_REGISTRY_PATH)
         return False
 
 
-def generate_qr_code(data: str, size: int = 10) -> Image:
-    """Generate QR code for session data"""
-    if not QR_AVAILABLE:
-        return None
-    
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=size,
-        border=4,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
+@lru_cache(maxsize=128)
+def _generate_qr_raw(data: str, size: int) -> bytes:
+    """Render a bordered QR code as PNG bytes (memoized per data and size)"""
+    if SEGNO_AVAILABLE:
+        qr = segno.make(data, error='h', micro=False)
+        modules = np.array(qr.matrix, dtype=bool)
+    else:
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_H,
+            box_size=size,
+            border=0,
+        )
+        qr.add_data(data)
+        qr.make(fit=True)
+        modules = np.array(qr.get_matrix(), dtype=bool)
     
-    # Create QR code image with colors
-    img = qr.make_image(fill_color="black", back_color="white")
+    # Scale modules to pixels with the white quiet zone, then drop into the colored border
+    modules = np.pad(modules, 4)
+    pixels = np.where(modules, 0, 255).astype(np.uint8).repeat(size, axis=0).repeat(size, axis=1)
+    height, width = pixels.shape
+    arr = np.full((height + 20, width + 20, 3), QR_BORDER_RGB, dtype=np.uint8)
+    arr[10:10 + height, 10:10 + width] = pixels[..., None]
+    new_img = Image.fromarray(arr, 'RGB')
     
-    # Add logo/watermark (optional)
-    img = img.convert('RGB')
+    # Fast zlib level: the image is tiny and regenerated on reruns
+    buffered = BytesIO()
+    new_img.save(buffered, format="PNG", compress_level=1)
+    return buffered.getvalue()
+
+
+def generate_qr_png(data: str, size: int = 10) -> bytes:
+    """Generate QR code for session data as PNG bytes, ready for st.image/download_button"""
+    if not _ensure_qr():
+        return None
     
-    # Add colored border
-    width, height = img.size
-    new_img = Image.new('RGB', (width + 20, height + 20), color='#00d4aa')
-    new_img.paste(img, (10, 10))
+    return _generate_qr_raw(data, size)
+
+
+def generate_qr_code(data: str, size: int = 10) -> "Image.Image":
+    """Generate QR code for session data"""
+    if not _ensure_qr():
+        return None
     
-    return new_img
+    return Image.open(BytesIO(_generate_qr_raw(data, size)))
 
 
 def generate_session_qr_data(session_id: str, user_id: str, 
                             device_id: str = None) -> dict:
     """Generate QR code data for session"""
     
+    timestamp = datetime.now().isoformat()
+    
     # Create secure token
-    token_data = f"{session_id}:{user_id}:{datetime.now().isoformat()}"
-    security_token = hashlib.sha256(token_data.encode()).hexdigest()[:16]
+    token_data = f"{session_id}:{user_id}:{timestamp}"
+    security_token = hashlib.blake2b(token_data.encode(), digest_size=8).hexdigest()
     
     qr_data = {
         "type": "medical_ai_session",
@@ -125,7 +330,7 @@ def generate_session_qr_data(session_id: str, user_id: str,
         "user_id": user_id,
         "device_id": device_id,
         "token": security_token,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": timestamp,
         "continuity_url": f"https://medical-ai.app/continue/{session_id}/{security_token}"
     }
     
@@ -136,27 +341,68 @@ class ScanContinuityManager:
     """Manages cross-device scan continuity with QR support"""
     
     def __init__(self):
+        global _db_ready
+        if not _db_ready:
+            init_continuity_db()
+            _db_ready = True
+        
         self.sessions = load_scan_sessions()
         self.devices = load_devices()
+        self._index_sessions()
+        
+        # Changed since the last flush(); written once at the end of a rerun
+        self._dirty_sessions = set()
+        self._dirty_devices = set()
+        
+        # One instance is shared by every session thread (see get_manager)
+        self._lock = threading.Lock()
+    
+    def invalidate(self):
+        """Re-read sessions and devices from disk (e.g. after another worker wrote them)"""
+        with self._lock:
+            self._flush()
+            self.sessions = load_scan_sessions()
+            self.devices = load_devices()
+            self._index_sessions()
+    
+    def _index_sessions(self):
+        """Build user_id -> session IDs, kept in creation order (dict as ordered set)"""
+        self._by_user = defaultdict(dict)
+        for session_id, session in self.sessions.items():
+            self._by_user[session["user_id"]][session_id] = None
+        
+        # session_id -> set(shared_devices), built on first membership test
+        self._shared_sets = {}
+    
+    def _shared_with(self, session_id: str) -> set:
+        """Devices a session is shared with, as a set for O(1) membership tests"""
+        shared = self._shared_sets.get(session_id)
+        if shared is None:
+            shared = set(self.sessions[session_id].get("shared_devices", ()))
+            self._shared_sets[session_id] = shared
+        return shared
     
     def register_device(self, device_name: str, device_id: str = None) -> dict:
         """Register current device"""
         
         if device_id is None:
-            device_id = str(uuid.uuid4())
+            device_id = secrets.token_hex(16)
+        
+        now = datetime.now().isoformat()
         
         device_info = {
             "device_id": device_id,
             "device_name": device_name,
             "device_type": "Web/Mobile",
-            "registered_date": datetime.now().isoformat(),
-            "last_sync": datetime.now().isoformat(),
+            "registered_date": now,
+            "last_sync": now,
             "active_sessions": 0,
             "qr_scans": []  # Track QR scan history
         }
         
-        self.devices[device_id] = device_info
-        save_devices(self.devices)
+        with self._lock:
+            self.devices[device_id] = device_info
+            self._dirty_devices.add(device_id)
         
         return device_info
     
@@ -164,15 +410,16 @@ class ScanContinuityManager:
                            device_id: str) -> dict:
         """Create new scan analysis session"""
         
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_hex(16)
+        now = datetime.now().isoformat()
         
         session = {
             "session_id": session_id,
             "user_id": user_id,
             "disease": disease,
             "device_id": device_id,
-            "created_date": datetime.now().isoformat(),
-            "last_modified": datetime.now().isoformat(),
+            "created_date": now,
+            "last_modified": now,
             "status": "in_progress",
             "analysis_results": {},
             "image_metadata": {},
@@ -182,8 +429,10 @@ class ScanContinuityManager:
             "qr_scans": []  # Track QR scan history
         }
         
-        self.sessions[session_id] = session
-        save_scan_sessions(self.sessions)
+        with self._lock:
+            self.sessions[session_id] = session
+            self._by_user[user_id][session_id] = None
+            self._dirty_sessions.add(session_id)
         
         return session
     
@@ -193,28 +442,70 @@ class ScanContinuityManager:
     
     def update_session(self, session_id: str, updates: dict) -> bool:
         """Update session with new analysis results"""
+        with self._lock:
+            return self._update_session(session_id, updates)
+    
+    def _update_session(self, session_id: str, updates: dict) -> bool:
+        """update_session body; the caller holds self._lock"""
         
         if session_id not in self.sessions:
             return False
         
         session = self.sessions[session_id]
+        
+        # Nothing changes: skip the timestamp bump and the disk write
+        if updates is not session and all(session.get(k) == v for k, v in updates.items()):
+            return True
+        
         session.update(updates)
+        if "shared_devices" in updates:
+            self._shared_sets.pop(session_id, None)
         session["last_modified"] = datetime.now().isoformat()
         
         self.sessions[session_id] = session
-        return save_scan_sessions(self.sessions)
+        self._dirty_sessions.add(session_id)
+        return True
     
-    def sync_to_device(self, session_id: str, device_id: str) -> dict:
-        """Sync session to another device"""
+    def flush(self) -> bool:
+        """Write every session and device changed since the last flush"""
+        with self._lock:
+            return self._flush()
+    
+    def _flush(self) -> bool:
+        """flush body; the caller holds self._lock"""
+        ok = True
         
-        session = self.get_session(session_id)
+        if self._dirty_sessions:
+            dirty, self._dirty_sessions = self._dirty_sessions, set()
+            for session_id in dirty:
+                if not append_session_delta(session_id, self.sessions[session_id]):
+                    # Keep it dirty so the next flush retries the write
+                    self._dirty_sessions.add(session_id)
+                    ok = False
+            ok = compact_sessions(self.sessions) and ok
         
-        if not session:
-            return {"error": "Session not found"}
+        if self._dirty_devices:
+            dirty, self._dirty_devices = self._dirty_devices, set()
+            if not save_devices(self.devices):
+                self._dirty_devices |= dirty
+                ok = False
         
-        if device_id not in session["shared_devices"]:
-            session["shared_devices"].append(device_id)
-            self.update_session(session_id, session)
+        return ok
+    
+    def sync_to_device(self, session_id: str, device_id: str) -> dict:
+        """Sync session to another device"""
+        
+        with self._lock:
+            session = self.get_session(session_id)
+            
+            if not session:
+                return {"error": "Session not found"}
+            
+            if device_id not in self._shared_with(session_id):
+                self._update_session(
+                    session_id,
+                    {"shared_devices": session["shared_devices"] + [device_id]}
+                )
         
         return {
             "status": "synced",
@@ -226,39 +517,51 @@ class ScanContinuityManager:
     def get_user_sessions(self, user_id: str, device_id: str = None) -> list:
         """Get all sessions for user, optionally filtered by device"""
         
-        user_sessions = [
-            session for session_id, session in self.sessions.items()
-            if session["user_id"] == user_id
-        ]
-        
-        if device_id:
-            user_sessions = [
-                s for s in user_sessions 
-                if device_id in s.get("shared_devices", [])
-            ]
-        
-        return user_sessions
+        with self._lock:
+            session_ids = self._by_user.get(user_id, ())
+            
+            if device_id:
+                return [
+                    self.sessions[i] for i in session_ids
+                    if device_id in self._shared_with(i)
+                ]
+            
+            return [self.sessions[i] for i in session_ids]
     
     def generate_continuity_link(self, session_id: str) -> str:
         """Generate shareable continuity link"""
         
         # Create secure token
         token_data = f"{session_id}:{datetime.now().isoformat()}"
-        token = hashlib.sha256(token_data.encode()).hexdigest()[:16]
+        token = hashlib.blake2b(token_data.encode(), digest_size=8).hexdigest()
         
         return f"https://medical-ai.app/continue/{session_id}/{token}"
     
     def record_qr_scan(self, session_id: str, device_id: str, scan_method: str = "camera"):
         """Record QR scan event"""
-        session = self.get_session(session_id)
-        if session:
-            scan_event = {
-                "device_id": device_id,
-                "scan_time": datetime.now().isoformat(),
-                "scan_method": scan_method
-            }
-            session["qr_scans"].append(scan_event)
-            self.update_session(session_id, session)
+        with self._lock:
+            session = self.get_session(session_id)
+            if session:
+                scan_event = {
+                    "device_id": device_id,
+                    "scan_time": datetime.now().isoformat(),
+                    "scan_method": scan_method
+                }
+                # Keep only the recent history the UI shows
+                qr_scans = session["qr_scans"][-(QR_SCAN_HISTORY - 1):] + [scan_event]
+                self._update_session(session_id, {"qr_scans": qr_scans})
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(timestamp: str) -> datetime:
+    """datetime.fromisoformat, memoized since the same stored timestamps are shown every rerun"""
+    return datetime.fromisoformat(timestamp)
+
+
+@st.cache_resource(show_spinner=False)
+def get_manager() -> ScanContinuityManager:
+    """Process-wide continuity manager; its in-memory state is authoritative"""
+    return ScanContinuityManager()
 
 
 def show_cross_device_continuity(username: str):
@@ -270,7 +573,13 @@ def show_cross_device_continuity(username: str):
         "Scan to instantly resume on any device!"
     )
     
-    manager = ScanContinuityManager()
+    manager = get_manager()
+    
+    # One clock read for every "time since" shown on this rerun
+    now = datetime.now()
+    
+    # Shared by the QR generator and the session list below
+    user_sessions = manager.get_user_sessions(username)
     
     # QR Code Scanner Section (NEW)
     st.markdown("### 📷 Quick Connect with QR Code")
@@ -313,21 +622,16 @@ def show_cross_device_continuity(username: str):
             st.markdown("**📱 Or use mobile app:**")
             
             # Generate app download QR
-            if QR_AVAILABLE:
-                app_url = "https://mediaiapp.streamlit.app/"
-                app_qr = generate_qr_code(app_url, size=5)
-                if app_qr:
-                    buffered = BytesIO()
-                    app_qr.save(buffered, format="PNG")
-                    st.image(buffered.getvalue(), caption="Scan to download mobile app", width=200)
+            # Constant URL: rendered once, then served from the QR cache
+            app_qr_png = generate_qr_png(APP_DOWNLOAD_URL, size=5)
+            if app_qr_png:
+                st.image(app_qr_png, caption="Scan to download mobile app", width=200)
             
             st.caption("Mobile app provides native QR scanning")
     
     elif scan_method == "🔗 Generate QR Code":
         st.markdown("#### 🔗 Generate Session QR Code")
         
-        user_sessions = manager.get_user_sessions(username)
-        
         if user_sessions:
             col1, col2 = st.columns([1, 1])
             
@@ -352,7 +656,7 @@ def show_cross_device_continuity(username: str):
             
             with col2:
                 if st.button("Generate QR Code", type="primary"):
-                    if QR_AVAILABLE:
+                    if _ensure_qr():
                         # Generate QR data
                         qr_data = generate_session_qr_data(
                             selected_session_obj['session_id'],
@@ -365,31 +669,28 @@ def show_cross_device_continuity(username: str):
                             pin = st.text_input("Enter 4-digit PIN", type="password", max_chars=4)
                             if pin and len(pin) == 4:
                                 qr_data["pin_required"] = True
-                                qr_data["pin_hash"] = hashlib.sha256(pin.encode()).hexdigest()[:8]
+                                qr_data["pin_hash"] = hashlib.blake2b(pin.encode(), digest_size=4).hexdigest()
                         elif qr_options == "⏰ Time-Limited":
-                            qr_data["expires"] = (datetime.now() + timedelta(minutes=5)).isoformat()
+                            qr_data["expires"] = (now + timedelta(minutes=5)).isoformat()
                         
-                        # Create QR code
-                        qr_json = json.dumps(qr_data)
-                        qr_img = generate_qr_code(qr_json, size=8)
+                        # Create QR code; a minified payload keeps the QR version small
+                        qr_json = _dumps(qr_data).decode()
+                        qr_png = generate_qr_png(qr_json, size=8)
                         
-                        if qr_img:
+                        if qr_png:
                             st.success("✅ QR Code Generated!")
                             
                             # Display QR code
-                            buffered = BytesIO()
-                            qr_img.save(buffered, format="PNG")
                             st.image(
-                                buffered.getvalue(),
+                                qr_png,
                                 caption=f"QR Code for: {selected_session_obj['disease']}",
                                 width=300
                             )
                             
                             # Update session
-                            selected_session_obj["qr_generated"] = True
                             manager.update_session(
                                 selected_session_obj['session_id'],
-                                selected_session_obj
+                                {"qr_generated": True}
                             )
                             
                             # Show QR details
@@ -397,7 +698,7 @@ def show_cross_device_continuity(username: str):
                                 st.json({
                                     "Session": selected_session_obj['session_id'][:12] + "...",
                                     "Type": qr_options,
-                                    "Generated": datetime.now().strftime("%H:%M:%S"),
+                                    "Generated": now.strftime("%H:%M:%S"),
                                     "Valid": "5 minutes" if "Time-Limited" in qr_options else "Unlimited",
                                     "Scans": len(selected_session_obj.get('qr_scans', []))
                                 })
@@ -405,7 +706,7 @@ def show_cross_device_continuity(username: str):
                             # Download QR button
                             st.download_button(
                                 label="📥 Download QR Code",
-                                data=buffered.getvalue(),
+                                data=qr_png,
                                 file_name=f"session_qr_{selected_session_obj['session_id'][:8]}.png",
                                 mime="image/png"
                             )
@@ -468,8 +769,7 @@ def show_cross_device_continuity(username: str):
                 
                 with col2:
                     status = "🟢 Active" if (
-                        datetime.now() - 
-                        datetime.fromisoformat(device['last_sync'])
+                        now - _parse_iso(device['last_sync'])
                     ).seconds < 3600 else "⚫ Inactive"
                     st.write(status)
                 
@@ -488,26 +788,23 @@ def show_cross_device_continuity(username: str):
     # Active sessions with QR indicators
     st.markdown("### 📂 Active Scan Sessions")
     
-    user_sessions = manager.get_user_sessions(username)
-    
     if user_sessions:
+        # All three counts in one pass over the sessions
+        total_count = active_count = qr_count = 0
+        for s in user_sessions:
+            total_count += 1
+            active_count += s["status"] == "in_progress"
+            qr_count += bool(s.get("qr_generated", False))
+        
         col1, col2, col3 = st.columns([1, 1, 1])
         
         with col1:
-            st.metric("Total Sessions", len(user_sessions))
+            st.metric("Total Sessions", total_count)
         
         with col2:
-            active_count = sum(
-                1 for s in user_sessions 
-                if s["status"] == "in_progress"
-            )
             st.metric("In Progress", active_count)
         
         with col3:
-            qr_count = sum(
-                1 for s in user_sessions 
-                if s.get("qr_generated", False)
-            )
             st.metric("QR Enabled", qr_count)
         
         st.markdown("---")
@@ -522,8 +819,8 @@ def show_cross_device_continuity(username: str):
                 st.caption(f"Session: {session['session_id'][:8]}...")
             
             with col2:
-                created = datetime.fromisoformat(session['created_date'])
-                days_ago = (datetime.now() - created).days
+                created = _parse_iso(session['created_date'])
+                days_ago = (now - created).days
                 st.caption(f"{days_ago}d ago")
             
             with col3:
@@ -549,23 +846,20 @@ def show_cross_device_continuity(username: str):
     with st.expander("📷 QR Code Activity", expanded=False):
         st.markdown("#### Recent QR Scans")
         
-        # Collect all QR scan events
-        all_scans = []
-        for session in user_sessions:
-            for scan in session.get('qr_scans', []):
-                scan['session_id'] = session['session_id'][:8]
-                scan['disease'] = session['disease']
-                all_scans.append(scan)
-        
-        if all_scans:
-            # Sort by time
-            all_scans.sort(
-                key=lambda x: datetime.fromisoformat(x['scan_time']),
-                reverse=True
-            )
-            
+        # Five most recent QR scan events; ISO timestamps order correctly as strings
+        recent_scans = heapq.nlargest(
+            5,
+            (
+                dict(scan, session_id=session['session_id'][:8], disease=session['disease'])
+                for session in user_sessions
+                for scan in session.get('qr_scans', ())
+            ),
+            key=lambda x: x['scan_time']
+        )
+        
+        if recent_scans:
             # Display recent scans
-            for scan in all_scans[:5]:
+            for scan in recent_scans:
                 col1, col2, col3 = st.columns([2, 1, 1])
                 
                 with col1:
@@ -573,8 +867,8 @@ def show_cross_device_continuity(username: str):
                     st.caption(f"Session: {scan['session_id']}...")
                 
                 with col2:
-                    scan_time = datetime.fromisoformat(scan['scan_time'])
-                    mins_ago = int((datetime.now() - scan_time).seconds / 60)
+                    scan_time = _parse_iso(scan['scan_time'])
+                    mins_ago = int((now - scan_time).seconds / 60)
                     st.caption(f"{mins_ago} min ago")
                 
                 with col3:
@@ -592,7 +886,7 @@ def show_cross_device_continuity(username: str):
     with col1:
         st.metric(
             "Last Sync",
-            datetime.now().strftime("%H:%M"),
+            now.strftime("%H:%M"),
             "Just now"
         )
     
@@ -604,6 +898,7 @@ def show_cross_device_continuity(username: str):
     
     with col4:
         if st.button("🔄 Force Sync"):
+            manager.invalidate()
             st.success("✅ Synchronized")
     
     st.markdown("---")
@@ -717,31 +1012,25 @@ def show_cross_device_continuity(username: str):
             if export_format == "QR Card":
                 # Generate printable QR card
                 st.info("📇 Generating QR Card for printing...")
-                if QR_AVAILABLE:
+                if _ensure_qr():
                     # Create QR with session data
                     qr_data = generate_session_qr_data(
                         user_sessions[selected_idx]['session_id'],
                         username
                     )
-                    qr_img = generate_qr_code(json.dumps(qr_data), size=10)
+                    qr_png = generate_qr_png(_dumps(qr_data).decode(), size=10)
                     
-                    if qr_img:
+                    if qr_png:
                         st.success("✅ QR Card ready!")
-                        buffered = BytesIO()
-                        qr_img.save(buffered, format="PNG")
                         
                         st.download_button(
                             label="📇 Download QR Card",
-                            data=buffered.getvalue(),
+                            data=qr_png,
                             file_name=f"qr_card_{user_sessions[selected_idx]['session_id'][:8]}.png",
                             mime="image/png"
                         )
             else:
-                session_data = json.dumps(
-                    user_sessions[selected_idx],
-                    indent=2,
-                    default=str
-                )
+                session_data = _dumps(user_sessions[selected_idx], indent=True)
                 
                 st.download_button(
                     label=f"📄 Download as {export_format}",
@@ -749,7 +1038,6 @@ def show_cross_device_continuity(username: str):
                     file_name=f"session_{user_sessions[selected_idx]['session_id'][:8]}.json",
                     mime="application/json"
                 )
-
-
-# Initialize on import
-init_continuity_db()
\ No newline at end of file
+    
+    # Persist everything this rerun changed in one go
+    manager.flush()
\ No newline at end of file
@@ -4,11 +4,26 @@
 import streamlit as st
 from datetime import datetime
 import json
+import logging
 import math
+import numpy as np
+import pandas as pd
+import re
+from collections import deque
+from functools import lru_cache
 
+logger = logging.getLogger(__name__)
 
-def inject_css():
-    st.markdown("""
+# Multi-keyword substring matching in one pass when pyahocorasick is installed
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+# Static page styles, built once at import
+_CSS_HTML = """
     <style>
     @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700;900&family=Roboto+Mono:wght@400;700&display=swap');
     
@@ -81,8 +96,20 @@ def inject_css():
         42% { transform: scale(1.1); }
         70% { transform: scale(1); }
     }
+    
+    .em-grid-3, .em-grid-4 { display: grid; gap: 1rem; }
+    .em-grid-3 { grid-template-columns: repeat(3, 1fr); }
+    .em-grid-4 { grid-template-columns: repeat(4, 1fr); }
+    
+    @media (max-width: 640px) {
+        .em-grid-3, .em-grid-4 { grid-template-columns: 1fr; }
+    }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+
+def inject_css():
+    st.markdown(_CSS_HTML, unsafe_allow_html=True)
 
 
 # ============================================
@@ -109,6 +136,58 @@ NORMAL_KEYWORDS = [
 ]
 
 
+def _build_automaton(keywords):
+    """Aho-Corasick automaton over the keywords, or None without pyahocorasick"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+def _automaton_matches(automaton, text):
+    """True if any keyword of the automaton occurs in text"""
+    return next(automaton.iter(text), None) is not None
+
+
+def _build_pattern(keywords):
+    """One compiled alternation over the keywords, so a single search replaces the keyword loop"""
+    return re.compile("|".join(map(re.escape, sorted(keywords, key=len, reverse=True))))
+
+
+_NORMAL_AC = _build_automaton(NORMAL_KEYWORDS)
+_NORMAL_RE = _build_pattern(NORMAL_KEYWORDS)
+
+# Separator-free keywords, matched against whole label tokens with a set lookup
+_TOKEN_SPLIT = re.compile(r"[\s_\-]+")
+_NORMAL_SINGLE = frozenset(k for k in NORMAL_KEYWORDS if not _TOKEN_SPLIT.search(k))
+
+# Canonical labels ("normal", "no tumor", "nv", ...) are often a keyword verbatim
+_NORMAL_KEYWORD_SET = frozenset(NORMAL_KEYWORDS)
+
+
+def _is_normal_lower(label_lower):
+    """is_normal_prediction for a label that is already stripped and lower-cased"""
+    
+    # Exact keyword: one hash probe, no tokenizing
+    if label_lower in _NORMAL_KEYWORD_SET:
+        return True
+    
+    # Fast path: the common single-token labels ("normal", "benign", ...) hit the set directly
+    if not _NORMAL_SINGLE.isdisjoint(_TOKEN_SPLIT.split(label_lower)):
+        return True
+    
+    # Check against known normal keywords
+    if _NORMAL_AC is not None:
+        return _automaton_matches(_NORMAL_AC, label_lower)
+    
+    return _NORMAL_RE.search(label_lower) is not None
+
+
+@lru_cache(maxsize=2048)
 def is_normal_prediction(predicted_label):
     """
     Check if the predicted label indicates a normal/healthy/non-disease result.
@@ -117,36 +196,84 @@ def is_normal_prediction(predicted_label):
     if predicted_label is None:
         return True
     
-    label_lower = predicted_label.strip().lower()
-    
-    # Check against known normal keywords
-    for keyword in NORMAL_KEYWORDS:
-        if keyword in label_lower:
-            return True
-    
-    return False
+    return _is_normal_lower(predicted_label.strip().lower())
+
+
+# Labels that indicate ACTUAL disease requiring attention
+DISEASE_POSITIVE_LABELS = {
+    "Pneumonia": ["pneumonia", "infected", "positive", "bacterial", "viral"],
+    "Brain Tumor": ["tumor", "glioma", "meningioma", "pituitary", "malignant"],
+    "Diabetic Retinopathy": ["proliferative", "severe", "moderate", "dr detected",
+                              "retinopathy", "diabetic retinopathy"],
+    "Tuberculosis": ["tuberculosis", "tb", "infected", "positive", "active tb"],
+    "Skin Cancer": [
+        "mel", "melanoma",              # HIGH - most dangerous
+        "bcc", "basal cell carcinoma",   # HIGH - cancer  
+        "akiec", "actinic keratoses",    # MODERATE - pre-cancerous
+    ],
+    "Malaria": ["parasitized", "infected", "positive", "malaria"],
+    "Dental": ["cavity", "decay", "caries", "infected", "abscess", "issue"],
+}
 
 
 def get_disease_positive_labels():
     """
     Returns labels that indicate ACTUAL disease requiring attention.
     """
-    return {
-        "Pneumonia": ["pneumonia", "infected", "positive", "bacterial", "viral"],
-        "Brain Tumor": ["tumor", "glioma", "meningioma", "pituitary", "malignant"],
-        "Diabetic Retinopathy": ["proliferative", "severe", "moderate", "dr detected",
-                                  "retinopathy", "diabetic retinopathy"],
-        "Tuberculosis": ["tuberculosis", "tb", "infected", "positive", "active tb"],
-        "Skin Cancer": [
-            "mel", "melanoma",              # HIGH - most dangerous
-            "bcc", "basal cell carcinoma",   # HIGH - cancer  
-            "akiec", "actinic keratoses",    # MODERATE - pre-cancerous
-        ],
-        "Malaria": ["parasitized", "infected", "positive", "malaria"],
-        "Dental": ["cavity", "decay", "caries", "infected", "abscess", "issue"],
-    }
+    return DISEASE_POSITIVE_LABELS
+
+
+def _build_positive_automaton():
+    """One automaton over every disease's positive labels; each keyword maps to the diseases it flags"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    
+    diseases_by_keyword = {}
+    for disease, labels in DISEASE_POSITIVE_LABELS.items():
+        for keyword in labels:
+            diseases_by_keyword.setdefault(keyword, set()).add(disease)
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, diseases in diseases_by_keyword.items():
+        automaton.add_word(keyword, frozenset(diseases))
+    automaton.make_automaton()
+    return automaton
+
+
+_POSITIVE_AC = _build_positive_automaton()
+
+# disease -> compiled alternation over its positive labels (fallback matcher)
+_POSITIVE_RE = {
+    disease: _build_pattern(labels)
+    for disease, labels in DISEASE_POSITIVE_LABELS.items()
+}
+
+
+@lru_cache(maxsize=2048)
+def _positive_diseases(label_lower):
+    """Every disease whose positive labels occur in the label, from a single automaton walk"""
+    found = set()
+    for _, diseases in _POSITIVE_AC.iter(label_lower):
+        found |= diseases
+    return frozenset(found)
+
+
+def _is_disease_positive_lower(disease_name, label_lower):
+    """Positive-label check for an already normalized label (normal labels not yet ruled out)"""
+    # Multi-disease pipelines ask about several diseases per label; they share one cached walk
+    if _POSITIVE_AC is not None:
+        return disease_name in _positive_diseases(label_lower)
+    
+    pattern = _POSITIVE_RE.get(disease_name)
+    if pattern is not None and pattern.search(label_lower):
+        return True
+    
+    # If we can't determine, assume it's NOT positive (safe default)
+    # This prevents false emergency alerts
+    return False
 
 
+@lru_cache(maxsize=2048)
 def is_disease_positive(disease_name, predicted_label):
     """
     Check if the predicted label indicates an ACTUAL disease detection.
@@ -158,19 +285,32 @@ def is_disease_positive(disease_name, predicted_label):
     label_lower = predicted_label.strip().lower()
     
     # First check: if it's clearly a normal/healthy prediction, return False
-    if is_normal_prediction(predicted_label):
+    if _is_normal_lower(label_lower):
         return False
     
     # Second check: see if it matches known positive labels for this disease
-    positive_labels = get_disease_positive_labels()
-    if disease_name in positive_labels:
-        for pos_label in positive_labels[disease_name]:
-            if pos_label in label_lower:
-                return True
+    return _is_disease_positive_lower(disease_name, label_lower)
+
+
+def is_normal_prediction_series(labels):
+    """
+    Vectorized is_normal_prediction for a column of labels (e.g. a CSV of predictions).
+    Missing labels count as normal, like None in the scalar version.
+    """
+    normalized = pd.Series(labels).str.strip().str.lower()
+    return normalized.str.contains(_NORMAL_RE, na=True)
+
+
+def is_disease_positive_series(disease_name, labels):
+    """Vectorized is_disease_positive for a column of labels; missing labels are not positive"""
+    normalized = pd.Series(labels).str.strip().str.lower()
     
-    # If we can't determine, assume it's NOT positive (safe default)
-    # This prevents false emergency alerts
-    return False
+    pattern = _POSITIVE_RE.get(disease_name)
+    if pattern is None:
+        return pd.Series(False, index=normalized.index)
+    
+    normal = normalized.str.contains(_NORMAL_RE, na=True)
+    return ~normal & normalized.str.contains(pattern, na=False)
 
 
 # ============================================
@@ -221,32 +361,173 @@ EMERGENCY_THRESHOLDS = {
 }
 
 
+# Debug log message per label-level risk
+_RISK_MESSAGES = {
+    "NONE": "✅ Safe prediction: '%s' - No emergency",
+    "LOW": "ℹ️ Low risk prediction: '%s'",
+    "MODERATE": "⚠️ Moderate risk prediction: '%s'",
+    "HIGH": "🚨 High risk prediction: '%s'",
+}
+
+# Label (or label fragment) -> risk level; exact match first, then substring either way
+_LABEL_RISK_MAP = {
+    # NONE risk (safe/benign)
+    "nv": "NONE", "melanocytic nevi": "NONE", "bkl": "NONE",
+    "benign keratosis": "NONE", "df": "NONE", "dermatofibroma": "NONE",
+    "vasc": "NONE", "vascular lesions": "NONE", "vascular": "NONE",
+    "normal": "NONE", "healthy": "NONE", "benign": "NONE",
+    "notumor": "NONE", "no tumor": "NONE", "no_tumor": "NONE",
+    "uninfected": "NONE", "negative": "NONE", "no dr": "NONE",
+    "clear": "NONE", "moles": "NONE", "mole": "NONE",
+    "no finding": "NONE", "no_finding": "NONE",
+    "no pneumonia": "NONE", "no tuberculosis": "NONE",
+    "no malaria": "NONE", "no cancer": "NONE",
+    "no cavity": "NONE", "no retinopathy": "NONE",
+    
+    # LOW risk
+    "mild": "LOW",
+    "non-proliferative": "LOW",
+    
+    # MODERATE risk
+    "akiec": "MODERATE", "actinic keratoses": "MODERATE",
+    "pituitary": "MODERATE", "moderate": "MODERATE",
+    "cavity": "MODERATE", "caries": "MODERATE", "decay": "MODERATE",
+    
+    # HIGH risk
+    "mel": "HIGH", "melanoma": "HIGH",
+    "bcc": "HIGH", "basal cell carcinoma": "HIGH",
+    "glioma": "HIGH", "meningioma": "HIGH",
+    "pneumonia": "HIGH", "tuberculosis": "HIGH", "tb": "HIGH",
+    "parasitized": "HIGH", "malignant": "HIGH",
+    "proliferative": "HIGH", "severe": "HIGH",
+    "infected": "HIGH", "positive": "HIGH",
+    "cancer": "HIGH", "carcinoma": "HIGH",
+}
+
+# Label fragment -> description for MODERATE predictions
+_MODERATE_DESCRIPTIONS = {
+    "akiec": "Pre-cancerous lesion (Actinic Keratoses) - requires monitoring and possible treatment",
+    "actinic keratoses": "Pre-cancerous lesion - requires monitoring and possible treatment",
+    "pituitary": "Pituitary tumor detected - requires specialist evaluation",
+    "moderate": "Moderate severity detected - requires follow-up",
+    "cavity": "Dental cavity detected - requires dental treatment",
+    "caries": "Dental caries detected - requires dental treatment",
+    "decay": "Dental decay detected - requires dental treatment",
+}
+
+# Alert level -> recommended actions; {disease} is filled in per assessment
+_ACTION_TEMPLATES = {
+    "CRITICAL": "🚨 IMMEDIATE EMERGENCY:\n1. Call 911 immediately\n2. Brief team: {disease} - Critical\n3. Urgent specialist consultation\n4. Initiate emergency protocols\n5. Notify ICU\n6. Prepare for intervention",
+    "SEVERE": "⚠️ URGENT ATTENTION:\n1. Contact specialist immediately\n2. Same-day appointment\n3. Prepare for hospitalization\n4. Have records ready\n5. Arrange transport\n6. Monitor deterioration",
+    "MODERATE": "ℹ️ PROMPT FOLLOW-UP:\n1. Schedule specialist appointment\n2. Arrange imaging if needed\n3. Start preliminary management\n4. Monitor symptoms\n5. Follow up within 1 week\n6. Patient education"
+}
+
+# Disease -> critical indicators listed on a generated alert
+_CRITICAL_INDICATORS = {
+    "Pneumonia": ("Severe hypoxia (SpO2 < 90%)", "Signs of sepsis", "Respiratory failure"),
+    "Brain Tumor": ("Herniation risk", "Mass effect", "Raised ICP"),
+    "Diabetic Retinopathy": ("Vitreous hemorrhage", "Acute vision loss", "Retinal detachment"),
+    "Tuberculosis": ("Respiratory failure", "Hemoptysis", "Miliary spread"),
+    "Skin Cancer": ("Rapid growth", "Ulceration", "Metastases")
+}
+_DEFAULT_INDICATORS = ("Consult specialist",)
+
+# Label-level risk -> (confidence factor, floor, cap) for the risk score
+_LABEL_RISK_SCORE = {
+    "NONE": (0.05, 0, 10),
+    "LOW": (0.15, 0, 20),
+    "MODERATE": (0.5, 20, 55),
+}
+
+# Fixed assessment fields for label-level risks that never escalate
+_LABEL_RISK_RESULTS = {
+    "NONE": {
+        "alert_level": "NONE",
+        "requires_emergency": False,
+        "severity_description": "No disease detected - Normal/Benign",
+        "recommended_action": "✅ No emergency action required. Continue routine care.",
+    },
+    "LOW": {
+        "alert_level": "LOW",
+        "requires_emergency": False,
+        "severity_description": "Low risk - routine monitoring recommended",
+        "recommended_action": "ℹ️ Schedule routine follow-up. No emergency action needed.",
+    },
+}
+
+# Disease detected but not listed in EMERGENCY_THRESHOLDS
+_NO_THRESHOLD_RESULT = {
+    "alert_level": "MODERATE",
+    "requires_emergency": False,
+    "severity_description": "Disease detected but no specific threshold defined",
+    "recommended_action": "ℹ️ Consult specialist for further evaluation.",
+}
+
+# Threshold-based alert level -> risk score multiplier
+_ALERT_MULTIPLIERS = {"CRITICAL": 1.0, "SEVERE": 0.8, "MODERATE": 0.6}
+
+# Same levels as array indices for the batch assessment
+_ALERT_LEVELS = ("CRITICAL", "SEVERE", "MODERATE")
+_LEVEL_MULTIPLIERS = np.array([_ALERT_MULTIPLIERS[level] for level in _ALERT_LEVELS])
+
+# Disease -> (icon, department) for the on-call specialist contact card
+_SPECIALIST_MAP = {
+    "Pneumonia": ("🫁", "Pulmonology"),
+    "Brain Tumor": ("🧠", "Neurosurgery"),
+    "Diabetic Retinopathy": ("👁️", "Ophthalmology"),
+    "Tuberculosis": ("🫁", "Infectious Disease"),
+    "Skin Cancer": ("🔬", "Oncology")
+}
+_DEFAULT_SPECIALIST = ("👨‍⚕️", "Specialist")
+
+# Disease -> critical symptoms offered in the symptom checklist
+_SYMPTOM_MAP = {
+    "Pneumonia": ("Severe difficulty breathing", "Confusion/altered mental status", "Cyanosis", "Chest pain", "SpO2 < 90%", "High fever > 39°C"),
+    "Brain Tumor": ("Severe headache", "Loss of consciousness", "Seizures", "Weakness/paralysis", "Speech difficulties", "Vision changes"),
+    "Diabetic Retinopathy": ("Sudden vision loss", "Floaters", "Eye pain", "Blurred vision", "Dark spots", "Light sensitivity"),
+    "Tuberculosis": ("Severe cough", "Hemoptysis", "Night sweats", "Weight loss", "Fever", "Fatigue"),
+    "Skin Cancer": ("Rapid growth", "Bleeding/oozing", "Color changes", "Irregular borders", "Ulceration", "New lesions")
+}
+_DEFAULT_SYMPTOMS = ("Consult specialist",)
+
+
 # ============================================
 # RENDER FUNCTIONS
 # ============================================
 
-def render_severity_gauge(severity_score, alert_level):
-    """Render severity gauge"""
+# Alert level -> severity gauge needle color
+_NEEDLE_COLORS = {"CRITICAL": "#ff0000", "SEVERE": "#ff6600", "MODERATE": "#ffcc00", "LOW": "#00ff00", "NONE": "#00ff00"}
+
+# Notification level -> (color, icon)
+_NOTIFICATION_STYLE = {
+    "CRITICAL": ("#ff0000", "🚨"),
+    "SEVERE": ("#ff6600", "⚠️"),
+    "INFO": ("#00f0ff", "ℹ️")
+}
+
+
+@lru_cache(maxsize=256)
+def _build_gauge_html(severity_score, alert_level):
+    """Severity gauge HTML (cached per score and level)"""
     
     rotation = -90 + (severity_score / 100) * 180
     
-    colors = {"CRITICAL": "#ff0000", "SEVERE": "#ff6600", "MODERATE": "#ffcc00", "LOW": "#00ff00", "NONE": "#00ff00"}
-    needle_color = colors.get(alert_level, "#00ff00")
+    needle_color = _NEEDLE_COLORS.get(alert_level, "#00ff00")
     
-    st.markdown("""
+    return f"""
     <div style="background: linear-gradient(145deg, #1a1a2e, #16213e); border-radius: 20px; padding: 2rem; 
                 border: 2px solid rgba(0, 240, 255, 0.3); animation: fadeInUp 0.8s ease-out;">
         <h3 style="color: #00f0ff; text-align: center; font-family: 'Orbitron', sans-serif; margin-bottom: 1rem;">
             ⚡ SEVERITY METER ⚡
         </h3>
         <div style="position: relative; width: 280px; height: 160px; margin: 0 auto;">
-            <svg viewBox="0 0 280 160" style="width: 100%%; height: 100%%;">
+            <svg viewBox="0 0 280 160" style="width: 100%; height: 100%;">
                 <defs>
-                    <linearGradient id="gaugeGrad" x1="0%%" y1="0%%" x2="100%%" y2="0%%">
-                        <stop offset="0%%" stop-color="#00ff00"/>
-                        <stop offset="33%%" stop-color="#ffcc00"/>
-                        <stop offset="66%%" stop-color="#ff6600"/>
-                        <stop offset="100%%" stop-color="#ff0000"/>
+                    <linearGradient id="gaugeGrad" x1="0%" y1="0%" x2="100%" y2="0%">
+                        <stop offset="0%" stop-color="#00ff00"/>
+                        <stop offset="33%" stop-color="#ffcc00"/>
+                        <stop offset="66%" stop-color="#ff6600"/>
+                        <stop offset="100%" stop-color="#ff0000"/>
                     </linearGradient>
                 </defs>
                 <path d="M 20 140 A 120 120 0 0 1 260 140" stroke="url(#gaugeGrad)" stroke-width="20" fill="none" stroke-linecap="round"/>
@@ -263,53 +544,50 @@ def render_severity_gauge(severity_score, alert_level):
         </div>
         <div style="text-align: center; margin-top: 1rem;">
             <span style="font-family: 'Orbitron', sans-serif; font-size: 2.5rem; color: {needle_color}; text-shadow: 0 0 15px {needle_color};">
-                {score:.1f}%
+                {severity_score:.1f}%
             </span>
             <div style="color: #888; font-size: 0.8rem; text-transform: uppercase; letter-spacing: 2px;">Severity Score</div>
         </div>
         <div style="text-align: center; margin-top: 1rem;">
             <span style="background: {needle_color}; color: white; padding: 0.5rem 1.5rem; border-radius: 20px; font-weight: bold;">
-                {level}
+                {alert_level}
             </span>
         </div>
     </div>
-    """.replace("{needle_color}", needle_color)
-       .replace("{rotation}", str(rotation))
-       .replace("{score:.1f}", "{:.1f}".format(severity_score))
-       .replace("{level}", alert_level), unsafe_allow_html=True)
+    """
 
 
-def render_vital_signs():
-    """Render ECG monitor"""
-    
-    points = []
-    for i in range(100):
-        x = i * 4
-        if i % 20 == 10:
-            y = 20
-        elif i % 20 == 11:
-            y = 80
-        elif i % 20 == 12:
-            y = 30
-        elif i % 20 == 13:
-            y = 50
-        else:
-            y = 50 + math.sin(i * 0.1) * 5
-        points.append(str(x) + "," + str(int(y)))
-    
-    ecg_path = " ".join(points)
-    
-    st.markdown("""
+def render_severity_gauge(severity_score, alert_level):
+    """Render severity gauge"""
+    st.markdown(_build_gauge_html(severity_score, alert_level), unsafe_allow_html=True)
+
+
+# ECG trace spikes at these offsets within each 20-point beat; flat sine wander elsewhere
+_ECG_SPIKE_Y = {10: 20, 11: 80, 12: 30, 13: 50}
+
+
+def _build_ecg_path():
+    """Polyline points for the ECG monitor (the trace is static)"""
+    return " ".join(
+        f"{i * 4},{int(_ECG_SPIKE_Y.get(i % 20, 50 + math.sin(i * 0.1) * 5))}"
+        for i in range(100)
+    )
+
+
+_ECG_PATH = _build_ecg_path()
+
+# ECG monitor HTML never changes, so it is built once at import
+_VITAL_SIGNS_HTML = f"""
     <div style="background: #000000; border: 3px solid #00ff00; border-radius: 15px; padding: 1rem; margin: 1rem 0;">
         <div style="display: flex; justify-content: space-between; margin-bottom: 0.5rem;">
             <span style="color: #00ff00; font-family: 'Roboto Mono', monospace;">❤️ ECG MONITOR</span>
             <span style="color: #00ff00;">♥ 72 BPM</span>
         </div>
-        <svg viewBox="0 0 400 100" style="width: 100%%; height: 80px;">
+        <svg viewBox="0 0 400 100" style="width: 100%; height: 80px;">
             <line x1="0" y1="25" x2="400" y2="25" stroke="rgba(0,255,0,0.1)" stroke-width="1"/>
             <line x1="0" y1="50" x2="400" y2="50" stroke="rgba(0,255,0,0.1)" stroke-width="1"/>
             <line x1="0" y1="75" x2="400" y2="75" stroke="rgba(0,255,0,0.1)" stroke-width="1"/>
-            <polyline points="{path}" stroke="#00ff00" stroke-width="2" fill="none" 
+            <polyline points="{_ECG_PATH}" stroke="#00ff00" stroke-width="2" fill="none" 
                       style="filter: drop-shadow(0 0 5px #00ff00); stroke-dasharray: 1000; stroke-dashoffset: 1000; animation: drawLine 3s linear infinite;"/>
         </svg>
         <div style="display: flex; justify-content: space-around; margin-top: 1rem; padding-top: 0.5rem; border-top: 1px solid rgba(0,255,0,0.3);">
@@ -331,40 +609,56 @@ def render_vital_signs():
             </div>
         </div>
     </div>
-    """.replace("{path}", ecg_path), unsafe_allow_html=True)
+    """
 
 
-def render_progress_ring(percentage, label, color):
-    """Render progress ring"""
+def render_vital_signs():
+    """Render ECG monitor"""
+    st.markdown(_VITAL_SIGNS_HTML, unsafe_allow_html=True)
+
+
+# Progress rings have r=40
+_RING_CIRCUMFERENCE = 2 * math.pi * 40
+
+
+@lru_cache(maxsize=256)
+def _build_ring_html(percentage, label, color):
+    """Progress ring HTML (cached per percentage, label and color)"""
     
-    circumference = 2 * 3.14159 * 40
-    offset = circumference - (percentage / 100) * circumference
+    offset = _RING_CIRCUMFERENCE - (percentage / 100) * _RING_CIRCUMFERENCE
     
-    st.markdown("""
+    return f"""
     <div style="text-align: center; padding: 1rem;">
         <svg width="100" height="100" style="transform: rotate(-90deg);">
             <circle cx="50" cy="50" r="40" fill="none" stroke="rgba(255,255,255,0.1)" stroke-width="8"/>
             <circle cx="50" cy="50" r="40" fill="none" stroke="{color}" stroke-width="8"
-                    stroke-linecap="round" stroke-dasharray="{circ}" stroke-dashoffset="{offset}"/>
+                    stroke-linecap="round" stroke-dasharray="{_RING_CIRCUMFERENCE}" stroke-dashoffset="{offset}"/>
         </svg>
         <div style="margin-top: -65px; font-family: 'Orbitron', sans-serif; font-size: 1.2rem; color: {color};">
-            {pct:.0f}%
+            {int(percentage)}%
         </div>
         <div style="color: #888; font-size: 0.7rem; margin-top: 0.3rem; text-transform: uppercase;">
             {label}
         </div>
     </div>
-    """.replace("{color}", color)
-       .replace("{circ}", str(circumference))
-       .replace("{offset}", str(offset))
-       .replace("{pct:.0f}", str(int(percentage)))
-       .replace("{label}", label), unsafe_allow_html=True)
+    """
 
 
-def render_metric_card(value, label, color):
-    """Render metric card"""
+def render_progress_ring(percentage, label, color):
+    """Render progress ring"""
+    st.markdown(_build_ring_html(percentage, label, color), unsafe_allow_html=True)
+
+
+def _truncate(x, n=15):
+    """Label text for a metric card, cut to n characters (no copy when it already fits)"""
+    s = x if isinstance(x, str) else str(x)
+    return s if len(s) <= n else s[:n]
+
+
+def _build_metric_card_html(value, label, color):
+    """Metric card HTML"""
     
-    st.markdown("""
+    return f"""
     <div style="background: linear-gradient(145deg, #1a1a2e, #16213e); border-radius: 15px; padding: 1.5rem; 
                 text-align: center; border: 1px solid rgba(0, 240, 255, 0.2);">
         <div style="font-family: 'Orbitron', sans-serif; font-size: 1.8rem; font-weight: bold; color: {color};">
@@ -374,22 +668,20 @@ def render_metric_card(value, label, color):
             {label}
         </div>
     </div>
-    """.replace("{color}", color)
-       .replace("{value}", str(value))
-       .replace("{label}", label), unsafe_allow_html=True)
+    """
 
 
-def render_notification(level, message):
-    """Render notification"""
+def render_metric_card(value, label, color):
+    """Render metric card"""
+    st.markdown(_build_metric_card_html(value, label, color), unsafe_allow_html=True)
+
+
+def _build_notification_html(level, message):
+    """Notification HTML"""
     
-    config = {
-        "CRITICAL": ("#ff0000", "🚨"),
-        "SEVERE": ("#ff6600", "⚠️"),
-        "INFO": ("#00f0ff", "ℹ️")
-    }
-    color, icon = config.get(level, ("#ffffff", "📢"))
+    color, icon = _NOTIFICATION_STYLE.get(level, ("#ffffff", "📢"))
     
-    st.markdown("""
+    return f"""
     <div style="background: linear-gradient(145deg, {color}22, {color}11); border: 2px solid {color}; 
                 border-radius: 10px; padding: 1rem; margin: 0.5rem 0; display: flex; align-items: center; gap: 1rem;">
         <div style="width: 40px; height: 40px; background: {color}; border-radius: 50%; 
@@ -403,235 +695,201 @@ def render_notification(level, message):
             <div style="color: #ccc; font-size: 0.85rem;">{message}</div>
         </div>
     </div>
-    """.replace("{color}", color)
-       .replace("{icon}", icon)
-       .replace("{level}", level)
-       .replace("{message}", message), unsafe_allow_html=True)
+    """
 
 
-def render_timeline(steps):
-    """Render timeline - FIXED"""
+def render_notification(level, message):
+    """Render notification"""
+    st.markdown(_build_notification_html(level, message), unsafe_allow_html=True)
+
+
+# (completed, active) -> (border color, icon) for timeline steps
+_TIMELINE_STEP_STYLE = {
+    (True, False): ("#00ff00", "✅"),
+    (True, True): ("#00ff00", "✅"),
+    (False, True): ("#ffcc00", "⏳"),
+    (False, False): ("#444444", "⭕"),
+}
+
+
+def _render_step_html(step):
+    """HTML for one timeline step (no blank lines, so steps can be joined into one block)"""
+    border_color, icon = _TIMELINE_STEP_STYLE[bool(step.get("completed")), bool(step.get("active"))]
     
-    st.markdown("""
+    return f"""<div style="padding: 1rem; margin: 0.5rem 0; background: linear-gradient(145deg, #1a1a2e, #16213e); 
+                    border-radius: 10px; border-left: 4px solid {border_color}; animation: fadeInUp 0.5s ease-out;">
+            <div style="display: flex; justify-content: space-between; align-items: center;">
+                <span style="color: white; font-weight: bold;">{icon} {step['title']}</span>
+                <span style="color: #888; font-size: 0.8rem;">{step.get('time', '')}</span>
+            </div>
+            <div style="color: #888; font-size: 0.85rem; margin-top: 0.3rem;">{step['description']}</div>
+        </div>"""
+
+
+def _build_timeline_html(steps):
+    """Timeline HTML; the steps are joined inside the container"""
+    
+    steps_html = "".join(_render_step_html(step) for step in steps)
+    
+    return f"""
     <div style="background: linear-gradient(145deg, #1a1a2e, #0f0f23); border-radius: 15px; 
                 padding: 1.5rem; border: 1px solid rgba(0, 240, 255, 0.2);">
         <h4 style="color: #00f0ff; font-family: 'Orbitron', sans-serif; margin-bottom: 1rem;">
             📋 EMERGENCY RESPONSE PROTOCOL
         </h4>
-    """, unsafe_allow_html=True)
-    
-    for step in steps:
-        if step.get("completed"):
-            border_color = "#00ff00"
-            icon = "✅"
-        elif step.get("active"):
-            border_color = "#ffcc00"
-            icon = "⏳"
-        else:
-            border_color = "#444444"
-            icon = "⭕"
-        
-        st.markdown("""
-        <div style="padding: 1rem; margin: 0.5rem 0; background: linear-gradient(145deg, #1a1a2e, #16213e); 
-                    border-radius: 10px; border-left: 4px solid {border_color}; animation: fadeInUp 0.5s ease-out;">
-            <div style="display: flex; justify-content: space-between; align-items: center;">
-                <span style="color: white; font-weight: bold;">{icon} {title}</span>
-                <span style="color: #888; font-size: 0.8rem;">{time}</span>
-            </div>
-            <div style="color: #888; font-size: 0.85rem; margin-top: 0.3rem;">{desc}</div>
-        </div>
-        """.replace("{border_color}", border_color)
-           .replace("{icon}", icon)
-           .replace("{title}", step["title"])
-           .replace("{time}", step.get("time", ""))
-           .replace("{desc}", step["description"]), unsafe_allow_html=True)
+        {steps_html}
+    </div>
+    """
+
+
+def render_timeline(steps):
+    """Render timeline - FIXED"""
     
-    st.markdown("</div>", unsafe_allow_html=True)
+    # Whole timeline in one markdown call so the steps sit inside the container
+    st.markdown(_build_timeline_html(steps), unsafe_allow_html=True)
 
 
-def render_action_card(action_text):
-    """Render action card"""
+def _build_action_card_html(action_text):
+    """Action card HTML"""
     
-    st.markdown("""
+    return f"""
     <div style="background: linear-gradient(145deg, #1a1a2e, #16213e); border-left: 5px solid #00f0ff; 
                 border-radius: 10px; padding: 1rem; margin: 0.5rem 0;">
-        <span style="color: #00f0ff; font-size: 1rem;">{text}</span>
+        <span style="color: #00f0ff; font-size: 1rem;">{action_text}</span>
     </div>
-    """.replace("{text}", action_text), unsafe_allow_html=True)
+    """
 
 
-def render_contact_card(icon, title, subtitle, detail, bg_color, border_color):
-    """Render contact card"""
+def render_action_card(action_text):
+    """Render action card"""
+    st.markdown(_build_action_card_html(action_text), unsafe_allow_html=True)
+
+
+def _build_contact_card_html(icon, title, subtitle, detail, bg_color, border_color):
+    """Contact card HTML"""
     
-    st.markdown("""
-    <div style="background: linear-gradient(145deg, {bg}, {bg}cc); border: 2px solid {border}; 
+    return f"""
+    <div style="background: linear-gradient(145deg, {bg_color}, {bg_color}cc); border: 2px solid {border_color}; 
                 border-radius: 15px; padding: 1.5rem; text-align: center;">
         <div style="font-size: 3rem;">{icon}</div>
-        <h3 style="color: {border}; font-family: 'Orbitron', sans-serif; margin: 0.5rem 0;">{title}</h3>
+        <h3 style="color: {border_color}; font-family: 'Orbitron', sans-serif; margin: 0.5rem 0;">{title}</h3>
         <div style="color: white;">{subtitle}</div>
         <div style="color: rgba(255,255,255,0.7); font-size: 0.85rem; margin-top: 0.3rem;">{detail}</div>
     </div>
-    """.replace("{bg}", bg_color)
-       .replace("{border}", border_color)
-       .replace("{icon}", icon)
-       .replace("{title}", title)
-       .replace("{subtitle}", subtitle)
-       .replace("{detail}", detail), unsafe_allow_html=True)
+    """
+
+
+def render_contact_card(icon, title, subtitle, detail, bg_color, border_color):
+    """Render contact card"""
+    st.markdown(_build_contact_card_html(icon, title, subtitle, detail, bg_color, border_color), unsafe_allow_html=True)
+
+
+def _build_grid_html(cards):
+    """Lay out card HTML side by side in one CSS grid (em-grid-3 / em-grid-4 from inject_css)"""
+    return f'<div class="em-grid-{len(cards)}">' + "".join(card.strip() for card in cards) + "</div>"
+
+
+def render_blocks(*blocks):
+    """
+    Render several markdown/HTML blocks with a single st.markdown call.
+    Blocks are stripped and separated by blank lines, so HTML blocks must not
+    contain blank lines themselves (markdown would end the HTML there).
+    """
+    st.markdown("\n\n".join(block.strip() for block in blocks), unsafe_allow_html=True)
 
 
 # ============================================
 # EMERGENCY ALERT SYSTEM CLASS
 # ============================================
 
+MAX_ALERT_HISTORY = 1000
+
+
 class EmergencyAlertSystem:
     def __init__(self):
-        self.alerts = []
+        # Most recent alerts only, so long sessions don't grow without bound
+        self.alerts = deque(maxlen=MAX_ALERT_HISTORY)
     
     def _get_risk_level(self, predicted_label):
         """Get risk level for a predicted label"""
         if predicted_label is None:
             return "NONE"
-        
-        label_lower = predicted_label.strip().lower()
-        
-        risk_map = {
-            # NONE risk (safe/benign)
-            "nv": "NONE", "melanocytic nevi": "NONE", "bkl": "NONE",
-            "benign keratosis": "NONE", "df": "NONE", "dermatofibroma": "NONE",
-            "vasc": "NONE", "vascular lesions": "NONE", "vascular": "NONE",
-            "normal": "NONE", "healthy": "NONE", "benign": "NONE",
-            "notumor": "NONE", "no tumor": "NONE", "no_tumor": "NONE",
-            "uninfected": "NONE", "negative": "NONE", "no dr": "NONE",
-            "clear": "NONE", "moles": "NONE", "mole": "NONE",
-            "no finding": "NONE", "no_finding": "NONE",
-            "no pneumonia": "NONE", "no tuberculosis": "NONE",
-            "no malaria": "NONE", "no cancer": "NONE",
-            "no cavity": "NONE", "no retinopathy": "NONE",
-            
-            # LOW risk
-            "mild": "LOW",
-            "non-proliferative": "LOW",
-            
-            # MODERATE risk
-            "akiec": "MODERATE", "actinic keratoses": "MODERATE",
-            "pituitary": "MODERATE", "moderate": "MODERATE",
-            "cavity": "MODERATE", "caries": "MODERATE", "decay": "MODERATE",
-            
-            # HIGH risk
-            "mel": "HIGH", "melanoma": "HIGH",
-            "bcc": "HIGH", "basal cell carcinoma": "HIGH",
-            "glioma": "HIGH", "meningioma": "HIGH",
-            "pneumonia": "HIGH", "tuberculosis": "HIGH", "tb": "HIGH",
-            "parasitized": "HIGH", "malignant": "HIGH",
-            "proliferative": "HIGH", "severe": "HIGH",
-            "infected": "HIGH", "positive": "HIGH",
-            "cancer": "HIGH", "carcinoma": "HIGH",
-        }
-        
+        return self._risk_level_lower(predicted_label.strip().lower())
+    
+    def _risk_level_lower(self, label_lower):
+        """_get_risk_level for an already stripped, lower-cased label"""
         # Direct match
-        if label_lower in risk_map:
-            return risk_map[label_lower]
+        if label_lower in _LABEL_RISK_MAP:
+            return _LABEL_RISK_MAP[label_lower]
         
         # Partial match
-        for key, risk in risk_map.items():
+        for key, risk in _LABEL_RISK_MAP.items():
             if key in label_lower or label_lower in key:
                 return risk
         
         return "LOW"
     
-    def _get_moderate_description(self, disease, predicted_label):
-        """Get description for moderate risk predictions"""
-        descriptions = {
-            "akiec": "Pre-cancerous lesion (Actinic Keratoses) - requires monitoring and possible treatment",
-            "actinic keratoses": "Pre-cancerous lesion - requires monitoring and possible treatment",
-            "pituitary": "Pituitary tumor detected - requires specialist evaluation",
-            "moderate": "Moderate severity detected - requires follow-up",
-            "cavity": "Dental cavity detected - requires dental treatment",
-            "caries": "Dental caries detected - requires dental treatment",
-            "decay": "Dental decay detected - requires dental treatment",
-        }
-        
-        if predicted_label:
-            label_lower = predicted_label.strip().lower()
-            for key, desc in descriptions.items():
+    def _get_moderate_description(self, disease, label_lower):
+        """Get description for moderate risk predictions (label already lower-cased)"""
+        if label_lower:
+            for key, desc in _MODERATE_DESCRIPTIONS.items():
                 if key in label_lower:
                     return desc
         
         return f"Moderate condition detected for {disease} - follow-up recommended"
     
+    def _label_risk_fields(self, disease, label_lower, risk):
+        """Alert fields for a label-level risk that never escalates (NONE / LOW / MODERATE)"""
+        if risk == "MODERATE":
+            return {
+                "alert_level": "MODERATE",
+                "requires_emergency": False,
+                "severity_description": self._get_moderate_description(disease, label_lower),
+                "recommended_action": self._get_action(disease, "MODERATE"),
+            }
+        return _LABEL_RISK_RESULTS[risk]
+    
+    def _threshold_fields(self, disease, alert_level):
+        """Alert fields for a threshold-based alert level"""
+        return {
+            "alert_level": alert_level,
+            "requires_emergency": alert_level != "MODERATE",
+            "severity_description": EMERGENCY_THRESHOLDS[disease]["severity_levels"].get(alert_level, "Unknown"),
+            "recommended_action": self._get_action(disease, alert_level),
+        }
+    
     def assess_emergency_level(self, disease, confidence, predicted_label=None):
         """
         Assess emergency level based on disease, confidence, AND predicted label.
         Uses risk classification to determine proper alert level.
         """
         
+        base = {"disease": disease, "confidence": confidence, "predicted_label": predicted_label}
+        timestamp = datetime.now().isoformat()
+        
         # ===== Get risk level from predicted label =====
         if predicted_label is not None:
-            risk = self._get_risk_level(predicted_label)
-            
-            # NO RISK - completely safe predictions (benign, normal, moles, etc.)
-            if risk == "NONE":
-                print(f"✅ Safe prediction: '{predicted_label}' - No emergency")
-                return {
-                    "disease": disease,
-                    "confidence": confidence,
-                    "predicted_label": predicted_label,
-                    "alert_level": "NONE",
-                    "requires_emergency": False,
-                    "severity_description": "No disease detected - Normal/Benign",
-                    "timestamp": datetime.now().isoformat(),
-                    "recommended_action": "✅ No emergency action required. Continue routine care.",
-                    "risk_score": max(0, min(confidence * 0.05, 10))
-                }
-            
-            # LOW RISK - minimal concern
-            if risk == "LOW":
-                print(f"ℹ️ Low risk prediction: '{predicted_label}'")
-                return {
-                    "disease": disease,
-                    "confidence": confidence,
-                    "predicted_label": predicted_label,
-                    "alert_level": "LOW",
-                    "requires_emergency": False,
-                    "severity_description": "Low risk - routine monitoring recommended",
-                    "timestamp": datetime.now().isoformat(),
-                    "recommended_action": "ℹ️ Schedule routine follow-up. No emergency action needed.",
-                    "risk_score": max(0, min(confidence * 0.15, 20))
-                }
+            # Normalize once; the risk and description lookups share it
+            label_lower = predicted_label.strip().lower()
+            risk = self._risk_level_lower(label_lower)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(_RISK_MESSAGES.get(risk, _RISK_MESSAGES["HIGH"]), predicted_label)
             
-            # MODERATE RISK - needs attention but not emergency (akiec, pituitary, etc.)
-            if risk == "MODERATE":
-                print(f"⚠️ Moderate risk prediction: '{predicted_label}'")
+            # NONE / LOW / MODERATE never escalate (benign, normal, moles, akiec, pituitary, etc.)
+            # HIGH RISK falls through to the threshold-based assessment below
+            if risk in _LABEL_RISK_SCORE:
+                factor, floor, cap = _LABEL_RISK_SCORE[risk]
                 return {
-                    "disease": disease,
-                    "confidence": confidence,
-                    "predicted_label": predicted_label,
-                    "alert_level": "MODERATE",
-                    "requires_emergency": False,
-                    "severity_description": self._get_moderate_description(disease, predicted_label),
-                    "timestamp": datetime.now().isoformat(),
-                    "recommended_action": self._get_action(disease, "MODERATE"),
-                    "risk_score": max(20, min(confidence * 0.5, 55))
+                    **base, **self._label_risk_fields(disease, label_lower, risk),
+                    "timestamp": timestamp,
+                    "risk_score": max(floor, min(confidence * factor, cap))
                 }
-            
-            # HIGH RISK - fall through to threshold-based assessment below
-            print(f"🚨 High risk prediction: '{predicted_label}'")
         
         # ===== HIGH RISK - Disease IS detected, assess severity =====
-        if disease not in EMERGENCY_THRESHOLDS:
-            return {
-                "disease": disease,
-                "confidence": confidence,
-                "predicted_label": predicted_label,
-                "alert_level": "MODERATE",
-                "requires_emergency": False,
-                "severity_description": "Disease detected but no specific threshold defined",
-                "timestamp": datetime.now().isoformat(),
-                "recommended_action": "ℹ️ Consult specialist for further evaluation.",
-                "risk_score": confidence * 0.5
-            }
+        thresholds = EMERGENCY_THRESHOLDS.get(disease)
+        if thresholds is None:
+            return {**base, **_NO_THRESHOLD_RESULT, "timestamp": timestamp, "risk_score": confidence * 0.5}
         
-        thresholds = EMERGENCY_THRESHOLDS[disease]
         critical = thresholds.get("critical_confidence", 95)
         
         if confidence >= critical:
@@ -641,40 +899,61 @@ class EmergencyAlertSystem:
         else:
             alert_level = "MODERATE"
         
-        requires_emergency = alert_level in ["CRITICAL", "SEVERE"]
-        
-        multipliers = {"CRITICAL": 1.0, "SEVERE": 0.8, "MODERATE": 0.6}
-        risk_score = min(100, confidence * multipliers.get(alert_level, 0.5) * 1.2)
-        
         return {
-            "disease": disease,
-            "confidence": confidence,
-            "predicted_label": predicted_label,
-            "alert_level": alert_level,
-            "requires_emergency": requires_emergency,
-            "severity_description": thresholds["severity_levels"].get(alert_level, "Unknown"),
-            "timestamp": datetime.now().isoformat(),
-            "recommended_action": self._get_action(disease, alert_level),
-            "risk_score": risk_score
+            **base, **self._threshold_fields(disease, alert_level),
+            "timestamp": timestamp,
+            "risk_score": min(100, confidence * _ALERT_MULTIPLIERS[alert_level] * 1.2)
         }
     
+    def assess_emergency_level_batch(self, diseases, confidences, predicted_labels=None):
+        """
+        Assess many predictions at once (e.g. a CSV of model outputs).
+        Same fields as assess_emergency_level per row; alert levels and risk scores
+        are computed with NumPy over the whole batch and label risk once per distinct label.
+        """
+        diseases = list(diseases)
+        confidences = list(confidences)
+        predicted_labels = [None] * len(diseases) if predicted_labels is None else list(predicted_labels)
+        
+        conf = np.asarray(confidences, dtype=float)
+        timestamp = datetime.now().isoformat()
+        
+        lower_of = {label: label.strip().lower() for label in set(predicted_labels) if label is not None}
+        risk_of = {label: self._risk_level_lower(lower) for label, lower in lower_of.items()}
+        risks = [risk_of[label] if label is not None else "HIGH" for label in predicted_labels]
+        
+        # Label-level scores: max(floor, min(confidence * factor, cap)); zeros for HIGH rows (unused)
+        bounds = np.array([_LABEL_RISK_SCORE.get(risk, (0, 0, 0)) for risk in risks], dtype=float).reshape(-1, 3)
+        label_scores = np.maximum(bounds[:, 1], np.minimum(conf * bounds[:, 0], bounds[:, 2])).tolist()
+        
+        # Threshold levels; NaN critical marks diseases without thresholds (handled separately)
+        critical = np.array([
+            EMERGENCY_THRESHOLDS[d].get("critical_confidence", 95) if d in EMERGENCY_THRESHOLDS else np.nan
+            for d in diseases
+        ], dtype=float)
+        level_idx = np.where(conf >= critical, 0, np.where(conf >= critical - 10, 1, 2))
+        threshold_scores = np.minimum(100, conf * _LEVEL_MULTIPLIERS[level_idx] * 1.2).tolist()
+        
+        results = []
+        for i, (disease, confidence, label, risk) in enumerate(zip(diseases, confidences, predicted_labels, risks)):
+            base = {"disease": disease, "confidence": confidence, "predicted_label": label}
+            
+            if risk in _LABEL_RISK_SCORE:
+                fields, risk_score = self._label_risk_fields(disease, lower_of[label], risk), label_scores[i]
+            elif disease not in EMERGENCY_THRESHOLDS:
+                fields, risk_score = _NO_THRESHOLD_RESULT, confidence * 0.5
+            else:
+                fields, risk_score = self._threshold_fields(disease, _ALERT_LEVELS[level_idx[i]]), threshold_scores[i]
+            
+            results.append({**base, **fields, "timestamp": timestamp, "risk_score": risk_score})
+        
+        return results
+    
     def _get_action(self, disease, level):
-        actions = {
-            "CRITICAL": "🚨 IMMEDIATE EMERGENCY:\n1. Call 911 immediately\n2. Brief team: " + disease + " - Critical\n3. Urgent specialist consultation\n4. Initiate emergency protocols\n5. Notify ICU\n6. Prepare for intervention",
-            "SEVERE": "⚠️ URGENT ATTENTION:\n1. Contact specialist immediately\n2. Same-day appointment\n3. Prepare for hospitalization\n4. Have records ready\n5. Arrange transport\n6. Monitor deterioration",
-            "MODERATE": "ℹ️ PROMPT FOLLOW-UP:\n1. Schedule specialist appointment\n2. Arrange imaging if needed\n3. Start preliminary management\n4. Monitor symptoms\n5. Follow up within 1 week\n6. Patient education"
-        }
-        return actions.get(level, "Consult healthcare provider")
+        template = _ACTION_TEMPLATES.get(level)
+        return template.format(disease=disease) if template else "Consult healthcare provider"
     
     def generate_alert(self, assessment):
-        indicators = {
-            "Pneumonia": ["Severe hypoxia (SpO2 < 90%)", "Signs of sepsis", "Respiratory failure"],
-            "Brain Tumor": ["Herniation risk", "Mass effect", "Raised ICP"],
-            "Diabetic Retinopathy": ["Vitreous hemorrhage", "Acute vision loss", "Retinal detachment"],
-            "Tuberculosis": ["Respiratory failure", "Hemoptysis", "Miliary spread"],
-            "Skin Cancer": ["Rapid growth", "Ulceration", "Metastases"]
-        }
-        
         alert = {
             "alert_id": "ALERT_" + datetime.now().strftime('%Y%m%d_%H%M%S'),
             "severity": assessment['alert_level'],
@@ -685,11 +964,54 @@ class EmergencyAlertSystem:
             "timestamp": assessment['timestamp'],
             "requires_emergency": assessment['requires_emergency'],
             "action_required": assessment['recommended_action'],
-            "critical_indicators": indicators.get(assessment['disease'], ["Consult specialist"])
+            "critical_indicators": list(_CRITICAL_INDICATORS.get(assessment['disease'], _DEFAULT_INDICATORS))
         }
         self.alerts.append(alert)
         return alert
 
+# ============================================
+# ALERT DOCUMENTS
+# ============================================
+
+@lru_cache(maxsize=128)
+def _build_report_body(severity, disease, predicted_label, confidence, risk_score, indicators, action_required):
+    """Alert report text below the ID/timestamp lines (same on every rerun for the same assessment)"""
+    indicator_lines = "".join(f"• {ind}\n" for ind in indicators)
+    return (
+        f"Severity: {severity}\n"
+        f"Disease: {disease}\n"
+        f"Predicted Label: {predicted_label}\n"
+        f"Confidence: {confidence:.1f}%\n"
+        f"Risk Score: {risk_score:.1f}%\n"
+        f"\nCRITICAL INDICATORS:\n{indicator_lines}"
+        f"\nACTIONS REQUIRED:\n{action_required}\n"
+        f"\n{'=' * 40}\n"
+        "DISCLAIMER: AI-generated alert for clinical support only.\n"
+    )
+
+
+def _build_report(alert):
+    """Plain-text alert report for download"""
+    body = _build_report_body(
+        alert['severity'], alert['disease'], alert.get('predicted_label', 'N/A'),
+        alert['confidence'], alert['risk_score'], tuple(alert['critical_indicators']), alert['action_required']
+    )
+    return f"EMERGENCY ALERT REPORT\n{'=' * 40}\nAlert ID: {alert['alert_id']}\nTimestamp: {alert['timestamp']}\n{body}"
+
+
+@lru_cache(maxsize=128)
+def _build_handoff(label, confidence, alert_level, recommended_action):
+    """Plain-text emergency handoff for download"""
+    return (
+        f"EMERGENCY HANDOFF\n{'=' * 40}\n"
+        f"CRITICAL: {label}\n"
+        f"Confidence: {confidence:.1f}%\n"
+        f"Severity: {alert_level}\n"
+        "\nPATIENT STATUS (Fill in):\n"
+        "BP: ___/___ | HR: ___ | SpO2: ___% | Temp: ___°C\n"
+        f"\nRECOMMENDED ACTIONS:\n{recommended_action}\n"
+    )
+
 # ============================================
 # NORMAL RESULT DISPLAY
 # ============================================
@@ -697,7 +1019,7 @@ class EmergencyAlertSystem:
 def show_normal_result(disease, confidence, predicted_label, assessment):
     """Display a calm, reassuring result for normal/healthy predictions"""
     
-    inject_css()
+    # Styles were already injected by show_emergency_alert_mode this run
     
     alert_level = assessment.get('alert_level', 'NONE')
     risk_score = assessment.get('risk_score', 5)
@@ -718,7 +1040,7 @@ def show_normal_result(disease, confidence, predicted_label, assessment):
             AI prediction indicates: <strong>{label}</strong>
         </p>
     </div>
-    """.replace("{label}", str(predicted_label)), unsafe_allow_html=True)
+    """.format(label=predicted_label), unsafe_allow_html=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -728,15 +1050,12 @@ def show_normal_result(disease, confidence, predicted_label, assessment):
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Info metrics
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        render_metric_card("{:.1f}%".format(confidence), "AI Confidence", "#00ff00")
-    with col2:
-        render_metric_card(alert_level, "Alert Level", "#00ff00")
-    with col3:
-        render_metric_card(str(predicted_label)[:15], "Prediction", "#00f0ff")
-    with col4:
-        render_metric_card("CLEAR", "Status", "#00ff00")
+    st.markdown(_build_grid_html([
+        _build_metric_card_html(f"{confidence:.1f}%", "AI Confidence", "#00ff00"),
+        _build_metric_card_html(alert_level, "Alert Level", "#00ff00"),
+        _build_metric_card_html(_truncate(predicted_label), "Prediction", "#00f0ff"),
+        _build_metric_card_html("CLEAR", "Status", "#00ff00"),
+    ]), unsafe_allow_html=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -752,8 +1071,7 @@ def show_normal_result(disease, confidence, predicted_label, assessment):
             <li>Standard follow-up care pathway is recommended</li>
         </ul>
     </div>
-    """.replace("{label}", str(predicted_label))
-       .replace("{conf:.1f}", "{:.1f}".format(confidence)), unsafe_allow_html=True)
+    """.format(label=predicted_label, conf=confidence), unsafe_allow_html=True)
     
     # Recommendations
     st.markdown("""
@@ -789,6 +1107,37 @@ def show_normal_result(disease, confidence, predicted_label, assessment):
 # MAIN DISPLAY FUNCTION
 # ============================================
 
+@st.fragment
+def _symptoms_checklist(symptoms):
+    """Symptom checkboxes and summary; toggling one reruns only this fragment"""
+    
+    cols = st.columns(2)
+    checked = 0
+    
+    for i, symptom in enumerate(symptoms):
+        with cols[i % 2]:
+            if st.checkbox(symptom, key="sym_" + str(i)):
+                checked += 1
+    
+    if checked > 0:
+        st.markdown("""
+        <div style="background: linear-gradient(145deg, #3a0a0a, #2a0505); border: 2px solid #ff0000; 
+                    border-radius: 10px; padding: 1rem; margin-top: 1rem; text-align: center;">
+            <h3 style="color: #ff0000; font-family: 'Orbitron', sans-serif; margin: 0;">
+                🚨 """ + str(checked) + """ CRITICAL SYMPTOMS IDENTIFIED
+            </h3>
+            <p style="color: #ff6666; margin: 0.5rem 0 0 0;">Immediate emergency intervention recommended</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+def _get_alert_system():
+    """This session's alert system, kept across reruns so its alert history persists"""
+    if "emergency_alert_system" not in st.session_state:
+        st.session_state["emergency_alert_system"] = EmergencyAlertSystem()
+    return st.session_state["emergency_alert_system"]
+
+
 def show_emergency_alert_mode(disease, confidence, predicted_label=None):
     """
     Display emergency alert interface.
@@ -801,27 +1150,25 @@ def show_emergency_alert_mode(disease, confidence, predicted_label=None):
     
     inject_css()
     
-    system = EmergencyAlertSystem()
+    system = _get_alert_system()
     assessment = system.assess_emergency_level(disease, confidence, predicted_label)
     
-    print(f"🚨 Emergency Assessment:")
-    print(f"   Disease: {disease}")
-    print(f"   Predicted Label: {predicted_label}")
-    print(f"   Confidence: {confidence:.1f}%")
-    print(f"   Alert Level: {assessment['alert_level']}")
-    print(f"   Requires Emergency: {assessment['requires_emergency']}")
-    print(f"   Risk Score: {assessment.get('risk_score', 0):.1f}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "🚨 Emergency Assessment: disease=%s label=%s confidence=%.1f%% level=%s emergency=%s risk=%.1f",
+            disease, predicted_label, confidence, assessment['alert_level'],
+            assessment['requires_emergency'], assessment.get('risk_score', 0)
+        )
     
     # ===== NORMAL/HEALTHY RESULT - Show calm display =====
     if not assessment['requires_emergency']:
         return show_normal_result(disease, confidence, predicted_label, assessment)
     
     # ===== DISEASE DETECTED - Show emergency alert =====
-    st.markdown("---")
     
     # Alert Header
     if assessment['alert_level'] == "CRITICAL":
-        st.markdown("""
+        header_html = """
         <div style="background: linear-gradient(135deg, #ff0000 0%, #990000 100%); border: 4px solid #ff0000; 
                     border-radius: 20px; padding: 2rem; text-align: center; animation: criticalPulse 1.5s infinite; 
                     position: relative; overflow: hidden; margin: 1rem 0;">
@@ -836,9 +1183,9 @@ def show_emergency_alert_mode(disease, confidence, predicted_label=None):
                 Detected: <strong>{label}</strong>
             </p>
         </div>
-        """.replace("{label}", str(predicted_label or disease)), unsafe_allow_html=True)
+        """.format(label=predicted_label or disease)
     else:
-        st.markdown("""
+        header_html = """
         <div style="background: linear-gradient(135deg, #ff6600 0%, #cc5200 100%); border: 3px solid #ff6600; 
                     border-radius: 15px; padding: 1.5rem; text-align: center; animation: severeGlow 2s infinite;">
             <h2 style="color: white; font-family: 'Orbitron', sans-serif; margin: 0;">⚠️ SEVERE ALERT ⚠️</h2>
@@ -847,65 +1194,27 @@ def show_emergency_alert_mode(disease, confidence, predicted_label=None):
                 Detected: <strong>{label}</strong>
             </p>
         </div>
-        """.replace("{label}", str(predicted_label or disease)), unsafe_allow_html=True)
+        """.format(label=predicted_label or disease)
     
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Severity Gauge (Full Width)
-    render_severity_gauge(assessment.get('risk_score', confidence), assessment['alert_level'])
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Vital Signs
-    st.markdown("### 💓 PATIENT MONITORING")
-    render_vital_signs()
-    
-    st.markdown("<br>", unsafe_allow_html=True)
+    alert_level = assessment['alert_level']
+    critical = alert_level == 'CRITICAL'
     
     # Metrics
-    st.markdown("### 📊 DIAGNOSTIC METRICS")
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        render_metric_card("{:.1f}%".format(confidence), "AI Confidence", "#00f0ff")
-    with col2:
-        color = "#ff0000" if assessment['alert_level'] == 'CRITICAL' else "#ff6600"
-        render_metric_card(assessment['alert_level'], "Alert Level", color)
-    with col3:
-        display_label = str(predicted_label or disease)[:12]
-        render_metric_card(display_label, "Condition", "#ff0000")
-    with col4:
-        render_metric_card("ACTIVE", "Status", "#ff0000")
-    
-    st.markdown("<br>", unsafe_allow_html=True)
+    metric_cards = [
+        _build_metric_card_html(f"{confidence:.1f}%", "AI Confidence", "#00f0ff"),
+        _build_metric_card_html(alert_level, "Alert Level", "#ff0000" if critical else "#ff6600"),
+        _build_metric_card_html(_truncate(predicted_label or disease, 12), "Condition", "#ff0000"),
+        _build_metric_card_html("ACTIVE", "Status", "#ff0000"),
+    ]
     
     # Risk Assessment
-    st.markdown("### 📈 RISK ASSESSMENT")
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        render_progress_ring(assessment.get('risk_score', 85), "Overall Risk", "#ff0000")
-    with col2:
-        render_progress_ring(confidence, "Confidence", "#00f0ff")
-    with col3:
-        urgency = 90 if assessment['alert_level'] == 'CRITICAL' else 70
-        render_progress_ring(urgency, "Urgency", "#ff6600")
-    with col4:
-        priority = 95 if assessment['alert_level'] == 'CRITICAL' else 80
-        render_progress_ring(priority, "Priority", "#ffcc00")
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Notifications
-    st.markdown("### 🔔 ACTIVE NOTIFICATIONS")
-    render_notification("CRITICAL", "High-confidence detection of " + str(predicted_label or disease))
-    render_notification("SEVERE", "Immediate specialist consultation required")
-    render_notification("INFO", "Emergency response protocol activated")
-    
-    st.markdown("<br>", unsafe_allow_html=True)
+    risk_rings = [
+        _build_ring_html(assessment.get('risk_score', 85), "Overall Risk", "#ff0000"),
+        _build_ring_html(confidence, "Confidence", "#00f0ff"),
+        _build_ring_html(90 if critical else 70, "Urgency", "#ff6600"),
+        _build_ring_html(95 if critical else 80, "Priority", "#ffcc00"),
+    ]
     
-    # Timeline
-    st.markdown("### ⏱️ RESPONSE PROTOCOL")
     timeline_steps = [
         {"title": "Alert Generated", "description": "AI detection triggered emergency alert", "time": "T+0:00", "completed": True},
         {"title": "Team Notified", "description": "Emergency team has been alerted", "time": "T+0:30", "completed": True},
@@ -914,122 +1223,72 @@ def show_emergency_alert_mode(disease, confidence, predicted_label=None):
         {"title": "Treatment Initiated", "description": "Emergency intervention started", "time": "T+5:00"},
         {"title": "Stabilization", "description": "Patient monitoring and stabilization", "time": "T+10:00"}
     ]
-    render_timeline(timeline_steps)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Actions
-    st.markdown("### 🎯 IMMEDIATE ACTIONS REQUIRED")
     actions = assessment['recommended_action'].split('\n')
-    for action in actions:
-        if action.strip():
-            render_action_card(action)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
     
     # Contacts
-    st.markdown("### 📞 EMERGENCY CONTACTS")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        render_contact_card("🚑", "EMERGENCY", "911", "Immediate Response", "#cc0000", "#ff0000")
-    
-    with col2:
-        specialist_map = {
-            "Pneumonia": ("🫁", "Pulmonology"),
-            "Brain Tumor": ("🧠", "Neurosurgery"),
-            "Diabetic Retinopathy": ("👁️", "Ophthalmology"),
-            "Tuberculosis": ("🫁", "Infectious Disease"),
-            "Skin Cancer": ("🔬", "Oncology")
-        }
-        icon, dept = specialist_map.get(disease, ("👨‍⚕️", "Specialist"))
-        render_contact_card(icon, dept, "On-Call Specialist", "Available 24/7", "#1a1a2e", "#00f0ff")
-    
-    with col3:
-        render_contact_card("🏥", "HOSPITAL", "Emergency Dept", "Direct Line", "#1a1a2e", "#ff6600")
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Symptoms
-    st.markdown("### ✓ CRITICAL SYMPTOMS ASSESSMENT")
-    
-    symptom_map = {
-        "Pneumonia": ["Severe difficulty breathing", "Confusion/altered mental status", "Cyanosis", "Chest pain", "SpO2 < 90%", "High fever > 39°C"],
-        "Brain Tumor": ["Severe headache", "Loss of consciousness", "Seizures", "Weakness/paralysis", "Speech difficulties", "Vision changes"],
-        "Diabetic Retinopathy": ["Sudden vision loss", "Floaters", "Eye pain", "Blurred vision", "Dark spots", "Light sensitivity"],
-        "Tuberculosis": ["Severe cough", "Hemoptysis", "Night sweats", "Weight loss", "Fever", "Fatigue"],
-        "Skin Cancer": ["Rapid growth", "Bleeding/oozing", "Color changes", "Irregular borders", "Ulceration", "New lesions"]
-    }
-    
-    symptoms = symptom_map.get(disease, ["Consult specialist"])
-    cols = st.columns(2)
-    checked = 0
-    
-    for i, symptom in enumerate(symptoms):
-        with cols[i % 2]:
-            if st.checkbox(symptom, key="sym_" + str(i)):
-                checked += 1
-    
-    if checked > 0:
-        st.markdown("""
-        <div style="background: linear-gradient(145deg, #3a0a0a, #2a0505); border: 2px solid #ff0000; 
-                    border-radius: 10px; padding: 1rem; margin-top: 1rem; text-align: center;">
-            <h3 style="color: #ff0000; font-family: 'Orbitron', sans-serif; margin: 0;">
-                🚨 """ + str(checked) + """ CRITICAL SYMPTOMS IDENTIFIED
-            </h3>
-            <p style="color: #ff6666; margin: 0.5rem 0 0 0;">Immediate emergency intervention recommended</p>
-        </div>
-        """, unsafe_allow_html=True)
+    icon, dept = _SPECIALIST_MAP.get(disease, _DEFAULT_SPECIALIST)
+    contact_cards = [
+        _build_contact_card_html("🚑", "EMERGENCY", "911", "Immediate Response", "#cc0000", "#ff0000"),
+        _build_contact_card_html(icon, dept, "On-Call Specialist", "Available 24/7", "#1a1a2e", "#00f0ff"),
+        _build_contact_card_html("🏥", "HOSPITAL", "Emergency Dept", "Direct Line", "#1a1a2e", "#ff6600"),
+    ]
     
-    st.markdown("<br>", unsafe_allow_html=True)
+    # Everything up to the symptom checklist is static HTML: one markdown call,
+    # with card rows laid out as CSS grids instead of st.columns
+    render_blocks(
+        "---",
+        header_html,
+        "<br>",
+        _build_gauge_html(assessment.get('risk_score', confidence), alert_level),
+        "<br>",
+        "### 💓 PATIENT MONITORING",
+        _VITAL_SIGNS_HTML,
+        "<br>",
+        "### 📊 DIAGNOSTIC METRICS",
+        _build_grid_html(metric_cards),
+        "<br>",
+        "### 📈 RISK ASSESSMENT",
+        _build_grid_html(risk_rings),
+        "<br>",
+        "### 🔔 ACTIVE NOTIFICATIONS",
+        _build_notification_html("CRITICAL", "High-confidence detection of " + str(predicted_label or disease)),
+        _build_notification_html("SEVERE", "Immediate specialist consultation required"),
+        _build_notification_html("INFO", "Emergency response protocol activated"),
+        "<br>",
+        "### ⏱️ RESPONSE PROTOCOL",
+        _build_timeline_html(timeline_steps),
+        "<br>",
+        "### 🎯 IMMEDIATE ACTIONS REQUIRED",
+        *(_build_action_card_html(action) for action in actions if action.strip()),
+        "<br>",
+        "### 📞 EMERGENCY CONTACTS",
+        _build_grid_html(contact_cards),
+        "<br>",
+        "### ✓ CRITICAL SYMPTOMS ASSESSMENT",
+    )
+    
+    _symptoms_checklist(_SYMPTOM_MAP.get(disease, _DEFAULT_SYMPTOMS))
     
     # Downloads
-    st.markdown("### 📄 EMERGENCY DOCUMENTATION")
+    render_blocks("<br>", "### 📄 EMERGENCY DOCUMENTATION")
     
     alert = system.generate_alert(assessment)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        report = "EMERGENCY ALERT REPORT\n"
-        report += "=" * 40 + "\n"
-        report += "Alert ID: " + alert['alert_id'] + "\n"
-        report += "Timestamp: " + alert['timestamp'] + "\n"
-        report += "Severity: " + alert['severity'] + "\n"
-        report += "Disease: " + alert['disease'] + "\n"
-        report += "Predicted Label: " + str(alert.get('predicted_label', 'N/A')) + "\n"
-        report += "Confidence: {:.1f}%\n".format(alert['confidence'])
-        report += "Risk Score: {:.1f}%\n".format(alert['risk_score'])
-        report += "\nCRITICAL INDICATORS:\n"
-        for ind in alert['critical_indicators']:
-            report += "• " + ind + "\n"
-        report += "\nACTIONS REQUIRED:\n"
-        report += alert['action_required'] + "\n"
-        report += "\n" + "=" * 40 + "\n"
-        report += "DISCLAIMER: AI-generated alert for clinical support only.\n"
-        
+        report = _build_report(alert)
         st.download_button("📄 Download Alert Report", report, "emergency_alert.txt", "text/plain", use_container_width=True)
     
     with col2:
-        handoff = "EMERGENCY HANDOFF\n"
-        handoff += "=" * 40 + "\n"
-        handoff += "CRITICAL: " + str(predicted_label or disease) + "\n"
-        handoff += "Confidence: {:.1f}%\n".format(confidence)
-        handoff += "Severity: " + assessment['alert_level'] + "\n"
-        handoff += "\nPATIENT STATUS (Fill in):\n"
-        handoff += "BP: ___/___ | HR: ___ | SpO2: ___% | Temp: ___°C\n"
-        handoff += "\nRECOMMENDED ACTIONS:\n"
-        handoff += assessment['recommended_action'] + "\n"
-        
+        handoff = _build_handoff(str(predicted_label or disease), confidence, assessment['alert_level'], assessment['recommended_action'])
         st.download_button("📞 Download Handoff", handoff, "handoff.txt", "text/plain", use_container_width=True)
     
     with col3:
         st.download_button("📊 Download JSON", json.dumps(alert, indent=2, default=str), "alert.json", "application/json", use_container_width=True)
     
-    st.markdown("<br>", unsafe_allow_html=True)
-    
     # Disclaimer
-    st.markdown("""
+    render_blocks("<br>", """
     <div style="background: linear-gradient(145deg, #3a0a0a, #2a0505); border: 3px solid #ff0000; 
                 border-radius: 15px; padding: 1.5rem; margin-top: 2rem; text-align: center;">
         <h4 style="color: #ff0000; font-family: 'Orbitron', sans-serif;">⚠️ CRITICAL DISCLAIMER ⚠️</h4>
@@ -1040,7 +1299,7 @@ def show_emergency_alert_mode(disease, confidence, predicted_label=None):
             <strong>Call emergency services immediately</strong> if life-threatening emergency is suspected.
         </p>
     </div>
-    """, unsafe_allow_html=True)
+    """)
     
     return assessment
 
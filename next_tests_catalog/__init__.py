@@ -0,0 +1,4 @@
+"""
+🔬 AI-Suggested Next Tests Catalog
+One module per disease exposing DATA; imported lazily by clinical_guideline_tests
+"""
@@ -0,0 +1,84 @@
+"""
+🧠 Brain Tumor - AI-suggested next tests (clinical protocols)
+"""
+
+from next_tests_catalog.records import ImmediateTest, FollowupTest, OptionalTest
+
+DATA = {
+    "immediate": [
+        ImmediateTest(
+            test="MRI Brain (3T) with contrast",
+            reason="Confirm tumor, assess mass effect, edema",
+            urgency="Urgent (within 24-48h)",
+            guideline="NICE/ACR",
+            cost="$1500-3000"
+        ),
+        ImmediateTest(
+            test="MRI with DWI/PWI",
+            reason="Assess perfusion and cellularity",
+            urgency="Same session",
+            guideline="ACR",
+            cost="Included in MRI"
+        ),
+        ImmediateTest(
+            test="MR Spectroscopy",
+            reason="Assess metabolic activity (choline/NAA ratio)",
+            urgency="Same session if available",
+            guideline="ACR",
+            cost="Included in MRI"
+        ),
+        ImmediateTest(
+            test="CBC, BMP, LFTs",
+            reason="Baseline labs before surgery/chemo",
+            urgency="Before treatment",
+            guideline="WHO",
+            cost="$150-250"
+        )
+    ],
+    "followup": [
+        FollowupTest(
+            test="Brain biopsy/Surgical pathology",
+            reason="Histological diagnosis, WHO grading, molecular testing",
+            timing="Within 1 week of imaging",
+            guideline="WHO/NICE",
+            cost="$2000-5000"
+        ),
+        FollowupTest(
+            test="Molecular testing (IDH1/IDH2, TP53, MGMT)",
+            reason="Prognostic markers, treatment planning",
+            timing="On pathology specimen",
+            guideline="WHO",
+            cost="$500-1500"
+        ),
+        FollowupTest(
+            test="Post-op MRI with contrast",
+            reason="Assess extent of resection",
+            timing="48-72 hours post-surgery",
+            guideline="ACR",
+            cost="$1500-3000"
+        ),
+        FollowupTest(
+            test="Monthly MRI during chemoradiation",
+            reason="Monitor treatment response",
+            timing="Throughout treatment",
+            guideline="NICE",
+            cost="$1500 x monthly"
+        )
+    ],
+    "optional": [
+        OptionalTest(
+            test="PET/CT (18F-FDG)",
+            reason="Assess metabolic activity if diagnosis uncertain",
+            when="If MRI inconclusive",
+            guideline="ACR",
+            cost="$3000-5000"
+        ),
+        OptionalTest(
+            test="Neuropsychological evaluation",
+            reason="Baseline cognitive function",
+            when="Before treatment",
+            guideline="NICE",
+            cost="$1000-2000"
+        )
+    ]
+}
@@ -0,0 +1,70 @@
+"""
+🦷 Dental - AI-suggested next tests (clinical protocols)
+"""
+
+from next_tests_catalog.records import ImmediateTest, FollowupTest, OptionalTest
+
+DATA = {
+    "immediate": [
+        ImmediateTest(
+            test="Periapical radiograph",
+            reason="Assess bone loss, periapical pathology",
+            urgency="At diagnosis",
+            guideline="NICE/ACR",
+            cost="$50-100"
+        ),
+        ImmediateTest(
+            test="Pulp vitality testing",
+            reason="Assess nerve status (vital vs necrotic)",
+            urgency="At assessment",
+            guideline="WHO",
+            cost="$20-50"
+        ),
+        ImmediateTest(
+            test="Intraoral clinical photography",
+            reason="Document baseline condition",
+            urgency="At initial visit",
+            guideline="NICE",
+            cost="$50-100"
+        ),
+        ImmediateTest(
+            test="Probing depth assessment",
+            reason="Periodontal status evaluation",
+            urgency="At assessment",
+            guideline="WHO/NICE",
+            cost="Included in exam"
+        )
+    ],
+    "followup": [
+        FollowupTest(
+            test="Periapical follow-up at 6 months",
+            reason="Verify successful treatment",
+            timing="6 months post-treatment",
+            guideline="NICE/ACR",
+            cost="$50-100"
+        ),
+        FollowupTest(
+            test="Bitewings every 24-36 months",
+            reason="Screen for new carious lesions",
+            timing="Annual or 2-year intervals",
+            guideline="ACR",
+            cost="$50-100"
+        ),
+        FollowupTest(
+            test="Recall visits every 6-12 months",
+            reason="Preventive care, scaling/polishing",
+            timing="Based on risk",
+            guideline="WHO/NICE",
+            cost="$100-200 per visit"
+        )
+    ],
+    "optional": [
+        OptionalTest(
+            test="CBCT if implant planning",
+            reason="3D assessment of bone anatomy",
+            when="Complex cases",
+            guideline="ACR",
+            cost="$300-600"
+        )
+    ]
+}
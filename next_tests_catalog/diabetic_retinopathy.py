@@ -0,0 +1,77 @@
+"""
+👁️ Diabetic Retinopathy - AI-suggested next tests (clinical protocols)
+"""
+
+from next_tests_catalog.records import ImmediateTest, FollowupTest, OptionalTest
+
+DATA = {
+    "immediate": [
+        ImmediateTest(
+            test="Dilated fundus examination",
+            reason="Direct visualization of retinal changes",
+            urgency="Urgent",
+            guideline="WHO/NICE",
+            cost="$100-200"
+        ),
+        ImmediateTest(
+            test="Optical Coherence Tomography (OCT)",
+            reason="Assess macular thickness, edema",
+            urgency="Same visit",
+            guideline="NICE/ACR",
+            cost="$200-400"
+        ),
+        ImmediateTest(
+            test="Visual acuity and IOP measurement",
+            reason="Baseline vision, glaucoma screening",
+            urgency="At each visit",
+            guideline="WHO",
+            cost="$100-200"
+        ),
+        ImmediateTest(
+            test="Fundus photography (45-50° field)",
+            reason="Document baseline for comparison",
+            urgency="At baseline",
+            guideline="ACR",
+            cost="$100-300"
+        )
+    ],
+    "followup": [
+        FollowupTest(
+            test="OCT macula every 4 weeks if treatment initiated",
+            reason="Monitor response to anti-VEGF/laser",
+            timing="Monthly x 3, then 2-3 monthly",
+            guideline="NICE",
+            cost="$200 per visit"
+        ),
+        FollowupTest(
+            test="Fluorescein angiography",
+            reason="Assess macular perfusion, nonperfusion areas",
+            timing="If macular edema suspected",
+            guideline="ACR",
+            cost="$300-500"
+        ),
+        FollowupTest(
+            test="Widefield fundus imaging",
+            reason="Assess peripheral retina ischemia",
+            timing="If proliferative disease",
+            guideline="ACR",
+            cost="$200-400"
+        ),
+        FollowupTest(
+            test="HbA1c every 3 months",
+            reason="Assess glycemic control",
+            timing="Every 3 months",
+            guideline="WHO",
+            cost="$50-100"
+        )
+    ],
+    "optional": [
+        OptionalTest(
+            test="Indocyanine green angiography",
+            reason="If fluorescein angiography inconclusive",
+            when="Specialized imaging only",
+            guideline="ACR",
+            cost="$500-800"
+        )
+    ]
+}
@@ -0,0 +1,84 @@
+"""
+🫁 Pneumonia - AI-suggested next tests (clinical protocols)
+"""
+
+from next_tests_catalog.records import ImmediateTest, FollowupTest, OptionalTest
+
+DATA = {
+    "immediate": [
+        ImmediateTest(
+            test="CBC with differential",
+            reason="Assess WBC elevation, left shift",
+            urgency="Immediately",
+            guideline="WHO/NICE",
+            cost="$50-100"
+        ),
+        ImmediateTest(
+            test="Blood cultures",
+            reason="Identify causative organism",
+            urgency="Before antibiotics",
+            guideline="WHO",
+            cost="$100-150"
+        ),
+        ImmediateTest(
+            test="CMP (electrolytes, renal function)",
+            reason="Baseline renal/hepatic function",
+            urgency="Before treatment",
+            guideline="NICE",
+            cost="$75-120"
+        ),
+        ImmediateTest(
+            test="Blood gas analysis",
+            reason="Assess hypoxia severity",
+            urgency="If SpO2 <92%",
+            guideline="ACR",
+            cost="$50-80"
+        )
+    ],
+    "followup": [
+        FollowupTest(
+            test="Sputum culture",
+            reason="Organism identification and sensitivities",
+            timing="Within 24-48 hours",
+            guideline="WHO",
+            cost="$75-125"
+        ),
+        FollowupTest(
+            test="Chest X-ray follow-up",
+            reason="Assess treatment response",
+            timing="7-10 days after treatment",
+            guideline="ACR",
+            cost="$100-200"
+        ),
+        FollowupTest(
+            test="Repeat CBC",
+            reason="Monitor WBC normalization",
+            timing="3-5 days into treatment",
+            guideline="NICE",
+            cost="$50-100"
+        ),
+        FollowupTest(
+            test="LFTs if antibiotics changed",
+            reason="Monitor for hepatotoxicity",
+            timing="If on macrolides > 5 days",
+            guideline="NICE",
+            cost="$75-100"
+        )
+    ],
+    "optional": [
+        OptionalTest(
+            test="CT chest (high-res)",
+            reason="If diagnosis uncertain or complications suspected",
+            when="If CXR inconclusive",
+            guideline="ACR",
+            cost="$500-1000"
+        ),
+        OptionalTest(
+            test="Procalcitonin level",
+            reason="Prognostic marker for severity",
+            when="Consider in severe cases",
+            guideline="NICE",
+            cost="$100-200"
+        )
+    ]
+}
@@ -0,0 +1,32 @@
+"""
+Record types for the next tests catalog, one per test category
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class ImmediateTest:
+    test: str
+    reason: str
+    urgency: str
+    guideline: str
+    cost: str
+
+
+@dataclass(frozen=True, slots=True)
+class FollowupTest:
+    test: str
+    reason: str
+    timing: str
+    guideline: str
+    cost: str
+
+
+@dataclass(frozen=True, slots=True)
+class OptionalTest:
+    test: str
+    reason: str
+    when: str
+    guideline: str
+    cost: str
@@ -0,0 +1,84 @@
+"""
+🔬 Skin Cancer - AI-suggested next tests (clinical protocols)
+"""
+
+from next_tests_catalog.records import ImmediateTest, FollowupTest, OptionalTest
+
+DATA = {
+    "immediate": [
+        ImmediateTest(
+            test="Full-thickness skin biopsy",
+            reason="Definitive histological diagnosis, staging",
+            urgency="Within 1-2 weeks",
+            guideline="WHO/NICE",
+            cost="$300-500"
+        ),
+        ImmediateTest(
+            test="Dermoscopy imaging",
+            reason="Document morphology for record",
+            urgency="At initial assessment",
+            guideline="ACR",
+            cost="$100-200"
+        ),
+        ImmediateTest(
+            test="CBC, BMP, LFTs",
+            reason="Baseline labs for staging",
+            urgency="Before treatment",
+            guideline="WHO",
+            cost="$150-250"
+        ),
+        ImmediateTest(
+            test="LDH level",
+            reason="Prognostic marker (elevated = worse prognosis)",
+            urgency="Baseline",
+            guideline="NICE",
+            cost="$50-100"
+        )
+    ],
+    "followup": [
+        FollowupTest(
+            test="Sentinel lymph node biopsy",
+            reason="Assess regional nodal involvement",
+            timing="If Breslow > 1mm or ulceration",
+            guideline="NICE",
+            cost="$3000-5000"
+        ),
+        FollowupTest(
+            test="Chest X-ray baseline",
+            reason="Screen for pulmonary metastases",
+            timing="At staging",
+            guideline="ACR",
+            cost="$100-200"
+        ),
+        FollowupTest(
+            test="CT chest/abdomen/pelvis if stage II-IV",
+            reason="Metastatic staging",
+            timing="If high-risk features",
+            guideline="ACR/NICE",
+            cost="$1000-2000"
+        ),
+        FollowupTest(
+            test="Brain MRI if stage III-IV",
+            reason="Screen for brain metastases",
+            timing="High-risk patients",
+            guideline="NICE",
+            cost="$1500-3000"
+        )
+    ],
+    "optional": [
+        OptionalTest(
+            test="PET/CT for stage III-IV",
+            reason="Whole-body metabolic imaging",
+            when="High-risk melanoma",
+            guideline="ACR",
+            cost="$3000-5000"
+        ),
+        OptionalTest(
+            test="Molecular testing (BRAF V600E, c-KIT)",
+            reason="Targeted therapy eligibility",
+            when="Stage III-IV",
+            guideline="WHO",
+            cost="$500-1500"
+        )
+    ]
+}
@@ -0,0 +1,84 @@
+"""
+🦠 Tuberculosis - AI-suggested next tests (clinical protocols)
+"""
+
+from next_tests_catalog.records import ImmediateTest, FollowupTest, OptionalTest
+
+DATA = {
+    "immediate": [
+        ImmediateTest(
+            test="Sputum smear microscopy (AFB) x3",
+            reason="Confirm TB diagnosis, assess infectiousness",
+            urgency="Within 24 hours",
+            guideline="WHO",
+            cost="$20-50"
+        ),
+        ImmediateTest(
+            test="Gene Xpert MTB/RIF",
+            reason="Rapid TB diagnosis + rifampicin resistance",
+            urgency="Immediately if available",
+            guideline="WHO",
+            cost="$15-20"
+        ),
+        ImmediateTest(
+            test="Chest X-ray (PA and lateral)",
+            reason="Assess extent, cavitation, complications",
+            urgency="Within 24-48 hours",
+            guideline="WHO/ACR",
+            cost="$50-100"
+        ),
+        ImmediateTest(
+            test="HIV test",
+            reason="HIV status affects TB management",
+            urgency="Mandatory",
+            guideline="WHO",
+            cost="$20-50"
+        )
+    ],
+    "followup": [
+        FollowupTest(
+            test="Drug sensitivity testing (DST)",
+            reason="Identify MDR-TB/XDR-TB",
+            timing="First positive specimen",
+            guideline="WHO",
+            cost="$50-200"
+        ),
+        FollowupTest(
+            test="Monthly sputum smear microscopy x3",
+            reason="Monitor treatment response, time to negativity",
+            timing="Months 1, 2, 3",
+            guideline="WHO/NICE",
+            cost="$20 per month"
+        ),
+        FollowupTest(
+            test="LFTs baseline and at month 2",
+            reason="Monitor hepatotoxicity from RIPE",
+            timing="Before treatment, 2 weeks in, month 2",
+            guideline="NICE",
+            cost="$75-100 x2"
+        ),
+        FollowupTest(
+            test="End-of-treatment chest X-ray",
+            reason="Document treatment response",
+            timing="At treatment completion",
+            guideline="ACR",
+            cost="$50-100"
+        )
+    ],
+    "optional": [
+        OptionalTest(
+            test="TB-LAMP or TrueNat",
+            reason="Rapid TB detection if Xpert unavailable",
+            when="Limited resource settings",
+            guideline="WHO",
+            cost="$10-15"
+        ),
+        OptionalTest(
+            test="High-res CT chest",
+            reason="If CXR shows atypical findings",
+            when="Diagnostic uncertainty",
+            guideline="ACR",
+            cost="$300-600"
+        )
+    ]
+}